@@ -8,6 +8,7 @@ import os
 from contextlib import asynccontextmanager
 
 from routers import upload, analyze, plan, run, cluster, patch, report, progress, recheck
+from services.agents.base_agent import shutdown_process_pool
 from services.llm.provider_base import LLMProvider
 from services.llm.openai_provider import OpenAIProvider
 from services.llm.anthropic_provider import AnthropicProvider
@@ -55,6 +56,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down application...")
+    shutdown_process_pool()
 
 # Create FastAPI application
 app = FastAPI(
@@ -2,16 +2,159 @@
 BaseAgent - Base class for all accessibility agents.
 """
 
+import asyncio
 import os
 import logging
-from typing import List, Dict, Any
-from pathlib import Path
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+import lxml.html
+from lxml import etree
 
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
 from utils.id_gen import generate_finding_id
 
 logger = logging.getLogger(__name__)
 
+# Evidence snippets are cut to this many characters; a large table or form
+# would otherwise be copied whole into every finding raised on it
+EVIDENCE_HTML_MAX_LENGTH = 1024
+
+# Subtrees that never hold page structure or media the agents inspect
+NON_CONTENT_TAGS = ('script', 'style', 'noscript', 'svg')
+
+# Uploads with fewer files than this are analyzed in threads: starting
+# worker processes costs more than the checks they would spread out
+PROCESS_POOL_MIN_FILES = 16
+
+# Files handed to a worker process per task
+PROCESS_POOL_CHUNK_SIZE = 4
+
+# Upper bound on worker processes, each of which holds its own interpreter
+PROCESS_POOL_MAX_WORKERS = 8
+
+@lru_cache(maxsize=64)
+def find_files(upload_path: str, extensions: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Find files under upload_path whose extension is in extensions.
+    
+    Results are cached per (upload_path, extensions) so agents sharing an
+    upload walk it once; call find_files.cache_clear() when a run ends.
+    """
+    extensions = frozenset(ext.lower() for ext in extensions)
+    if os.path.isfile(upload_path):
+        return (upload_path,) if os.path.splitext(upload_path)[1].lower() in extensions else ()
+    
+    files = []
+    # scandir entries carry the file type from the directory read, so
+    # no extra stat() per entry is needed
+    pending = [upload_path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions:
+                        files.append(entry.path)
+        except OSError:
+            continue
+    return tuple(files)
+
+def _parse_html_tree(file_path: str, skip_tags: Sequence[str]) -> lxml.html.HtmlElement:
+    # libxml2 reads and decodes the file itself; undecodable bytes become
+    # replacement characters instead of failing the parse
+    parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+    root = etree.parse(file_path, parser).getroot()
+    if root is None:
+        # Empty documents have no root; check them as an empty page
+        root = lxml.html.Element('html')
+    elif skip_tags:
+        etree.strip_elements(root, *skip_tags, with_tail=False)
+    return root
+
+def _make_soup(markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    try:
+        return BeautifulSoup(markup, 'lxml', parse_only=parse_only)
+    except FeatureNotFound:
+        return BeautifulSoup(markup, 'html.parser', parse_only=parse_only)
+
+class ParseCache:
+    """Parsed HTML trees shared by the agents of an analysis run.
+    
+    Entries are keyed by path, modification time and parse flavour, so a
+    file is parsed once per run however many agents read it, and parsed
+    again if it changes. Agents only read what they get back.
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_tree(self, file_path: str, skip_tags: Sequence[str] = ()) -> lxml.html.HtmlElement:
+        """Return the lxml.html tree for file_path, parsing it on first use."""
+        skip_tags = tuple(skip_tags)
+        return self._get(file_path, ('tree', skip_tags), lambda: _parse_html_tree(file_path, skip_tags))
+    
+    def _get(self, file_path: str, flavour: tuple, parse):
+        key = (file_path, os.stat(file_path).st_mtime_ns, flavour)
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                return parsed
+        
+        # Parse outside the lock so different files parse concurrently
+        parsed = parse()
+        with self._lock:
+            parsed = self._entries.setdefault(key, parsed)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return parsed
+    
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+parse_cache = ParseCache()
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Workers are spawned rather than forked: the event loop's
+            # threads may hold locks a forked child would inherit
+            _process_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, PROCESS_POOL_MAX_WORKERS),
+                mp_context=get_context('spawn')
+            )
+        return _process_pool
+
+def shutdown_process_pool() -> None:
+    """Stop the worker processes, if any were started; call on app shutdown."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _scan_files(agent_class: type, file_paths: Sequence[str], args: tuple = ()) -> List[List[Finding]]:
+    """Analyze file_paths with a fresh agent_class in a worker process."""
+    agent = agent_class()
+    try:
+        return [agent._analyze_file_with_caches(file_path, *args) for file_path in file_paths]
+    finally:
+        # Workers outlive the run, so they keep no trees between tasks
+        parse_cache.clear()
+
 class BaseAgent:
     """Base class for all accessibility agents."""
     
@@ -20,24 +163,132 @@ class BaseAgent:
         self.description = description
         self.criterion = criterion
         self.wcag_criterion = wcag_criterion
+        # Files are analyzed concurrently, so each worker thread keeps its
+        # own selector and snippet caches for the file it is working on
+        self._local = threading.local()
     
     async def analyze(self, upload_path: str) -> List[Finding]:
         """Analyze files for accessibility issues. Override in subclasses."""
         raise NotImplementedError("Subclasses must implement analyze method")
     
-    def _find_files(self, upload_path: str, extensions: List[str]) -> List[str]:
+    def _find_files(self, upload_path: str, extensions: Sequence[str]) -> List[str]:
         """Find files with specified extensions in upload path."""
-        files = []
-        upload_dir = Path(upload_path)
+        return list(find_files(upload_path, tuple(extensions)))
+    
+    async def _analyze_files(self, file_paths: Sequence[str], *args) -> List[List[Finding]]:
+        """Run _analyze_file over file_paths concurrently, in file order.
+        
+        Large uploads are spread over worker processes so the checks run
+        on every core; smaller ones use threads, which also share parsed
+        trees with the other agents. Agents using this must implement
+        _analyze_file and take no constructor arguments; args are passed
+        to every _analyze_file call after the file path.
+        """
+        if len(file_paths) < PROCESS_POOL_MIN_FILES or (os.cpu_count() or 1) < 2:
+            return await asyncio.gather(
+                *(asyncio.to_thread(self._analyze_file_with_caches, file_path, *args) for file_path in file_paths)
+            )
+        
+        loop = asyncio.get_running_loop()
+        pool = _get_process_pool()
+        chunks = [
+            file_paths[start:start + PROCESS_POOL_CHUNK_SIZE]
+            for start in range(0, len(file_paths), PROCESS_POOL_CHUNK_SIZE)
+        ]
+        batches = await asyncio.gather(
+            *(loop.run_in_executor(pool, _scan_files, type(self), chunk, args) for chunk in chunks)
+        )
+        return [results for batch in batches for results in batch]
+    
+    def _analyze_file(self, file_path: str, *args) -> List[Finding]:
+        """Analyze a single file. Override in subclasses using _analyze_files."""
+        raise NotImplementedError("Subclasses using _analyze_files must implement _analyze_file")
+    
+    def _analyze_file_with_caches(self, file_path: str, *args) -> List[Finding]:
+        """Run _analyze_file with selector and snippet caches for the file."""
+        # Keyed by element: the caches hold each lxml proxy, so the same node
+        # comes back as the same object for the rest of the file
+        self._local.selector_cache = {}
+        self._local.html_cache = {}
+        try:
+            return self._analyze_file(file_path, *args)
+        finally:
+            self._local.selector_cache = None
+            self._local.html_cache = None
+    
+    def _make_soup(self, markup: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        """Parse markup with lxml, falling back to html.parser when unavailable."""
+        return _make_soup(markup, parse_only)
+    
+    def _make_tree(self, file_path: str, skip_tags: Sequence[str] = ()) -> lxml.html.HtmlElement:
+        """Get the shared lxml.html tree of an HTML file for direct XPath queries.
         
-        if upload_dir.is_file():
-            if any(upload_dir.suffix.lower() == ext for ext in extensions):
-                files.append(str(upload_dir))
-        else:
-            for ext in extensions:
-                files.extend([str(f) for f in upload_dir.rglob(f'*{ext}')])
+        Comments are dropped by the parser and skip_tags subtrees are removed
+        before the tree is cached, so later queries never walk them.
+        """
+        return parse_cache.get_tree(file_path, skip_tags)
+    
+    def _bucket_by_tag(
+        self,
+        elements: List[lxml.html.HtmlElement],
+        groups: Optional[Dict[str, frozenset]] = None
+    ) -> Dict[str, List[lxml.html.HtmlElement]]:
+        """Sort elements into lists by tag name, keeping document order.
         
-        return files
+        Each entry in groups additionally collects the elements whose tag
+        name is in its set.
+        """
+        buckets = defaultdict(list)
+        group_items = groups.items() if groups else ()
+        for element in elements:
+            tag = element.tag
+            buckets[tag].append(element)
+            for key, tags in group_items:
+                if tag in tags:
+                    buckets[key].append(element)
+        return buckets
+    
+    def _element_html(self, element: lxml.html.HtmlElement) -> str:
+        """Serialize an lxml element for evidence, without its tail text.
+        
+        Memoized per file while _analyze_file_with_caches runs.
+        """
+        cache = getattr(self._local, 'html_cache', None)
+        if cache is None:
+            return lxml.html.tostring(element, encoding='unicode', with_tail=False)[:EVIDENCE_HTML_MAX_LENGTH]
+        html = cache.get(element)
+        if html is None:
+            html = cache[element] = lxml.html.tostring(
+                element, encoding='unicode', with_tail=False
+            )[:EVIDENCE_HTML_MAX_LENGTH]
+        return html
+    
+    def _get_selector(self, element: lxml.html.HtmlElement) -> str:
+        """Generate CSS selector for an lxml element.
+        
+        Memoized per file while _analyze_file_with_caches runs.
+        """
+        cache = getattr(self._local, 'selector_cache', None)
+        if cache is None:
+            return self._build_selector(element)
+        selector = cache.get(element)
+        if selector is None:
+            selector = cache[element] = self._build_selector(element)
+        return selector
+    
+    def _build_selector(self, element: lxml.html.HtmlElement) -> str:
+        """Build the CSS selector for an lxml element: #id, .classes or tag."""
+        attrib = element.attrib
+        if not attrib:
+            # Most reported elements have no attributes at all
+            return element.tag
+        element_id = attrib.get('id')
+        if element_id:
+            return f"#{element_id}"
+        classes = attrib.get('class', '').split()
+        if classes:
+            return f".{'.'.join(classes)}"
+        return element.tag
     
     def _create_finding(
         self,
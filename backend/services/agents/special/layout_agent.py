@@ -5,13 +5,48 @@ LayoutAgent - Detects layout and structure accessibility issues.
 import os
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
-from services.agents.base_agent import BaseAgent
+from services.agents.base_agent import BaseAgent, NON_CONTENT_TAGS
 import logging
 
 logger = logging.getLogger(__name__)
 
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+TABLE_CELL_TAGS = ('th', 'td')
+FORM_INPUT_TAGS = ('input', 'select', 'textarea')
+
+# Landmark elements and the ARIA role each one implies
+LANDMARKS = {
+    'main': 'main',
+    'nav': 'navigation',
+    'header': 'banner',
+    'footer': 'contentinfo',
+}
+
+# Queries are compiled once and shared by every file; unions of paths
+# return their matches in document order
+XP_HEADINGS = etree.XPath(' | '.join(f'//{tag}' for tag in HEADING_TAGS))
+XP_H1 = etree.XPath('//h1')
+XP_LANDMARKS = {
+    element: etree.XPath(f'//{element} | //*[@role="{role}"]')
+    for element, role in LANDMARKS.items()
+}
+XP_TABLES = etree.XPath('//table')
+XP_CAPTIONS = etree.XPath('.//caption')
+# Any element with a header cell role counts as a table header
+XP_TABLE_HEADERS = etree.XPath('.//th | .//*[@role="columnheader" or @role="rowheader"]')
+XP_ROWS = etree.XPath('.//tr')
+XP_CELLS = etree.XPath(' | '.join(f'.//{tag}' for tag in TABLE_CELL_TAGS))
+XP_UNORDERED_LISTS = etree.XPath('//ul')
+XP_ORDERED_LISTS = etree.XPath('//ol')
+XP_FORMS = etree.XPath('//form')
+XP_FORM_INPUTS = etree.XPath(' | '.join(f'.//{tag}' for tag in FORM_INPUT_TAGS))
+XP_FIELDSETS = etree.XPath('.//fieldset')
+XP_LABEL_TARGETS = etree.XPath('.//label/@for')
+
 class LayoutAgent(BaseAgent):
     """Agent for detecting layout and structure accessibility issues."""
     
@@ -29,20 +64,11 @@ class LayoutAgent(BaseAgent):
         
         try:
             # Find HTML files
-            html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
+            html_files = self._find_files(upload_path, HTML_EXTENSIONS)
             
-            for file_path in html_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    file_findings = await self._analyze_html_content(soup, file_path)
-                    findings.extend(file_findings)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing {file_path}: {str(e)}")
-                    findings.append(self._create_error_finding(file_path, str(e)))
+            # Files are independent, so analyze them concurrently
+            for file_findings in await self._analyze_files(html_files):
+                findings.extend(file_findings)
         
         except Exception as e:
             logger.error(f"LayoutAgent analysis failed: {str(e)}")
@@ -50,37 +76,51 @@ class LayoutAgent(BaseAgent):
         
         return findings
     
-    async def _analyze_html_content(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _analyze_file(self, file_path: str) -> List[Finding]:
+        """Read, parse and analyze a single HTML file."""
+        try:
+            root = self._parse_file(file_path)
+            return self._analyze_html_content(root, file_path)
+        
+        except Exception as e:
+            logger.error(f"Error analyzing {file_path}: {str(e)}")
+            return [self._create_error_finding(file_path, str(e))]
+    
+    def _parse_file(self, file_path: str) -> lxml.html.HtmlElement:
+        """Read and parse an HTML file."""
+        return self._make_tree(file_path, skip_tags=NON_CONTENT_TAGS)
+    
+    def _analyze_html_content(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Analyze HTML content for layout accessibility issues."""
         findings = []
         
         # Check heading structure
-        heading_findings = await self._check_heading_structure(soup, file_path)
+        heading_findings = self._check_heading_structure(root, file_path)
         findings.extend(heading_findings)
         
         # Check landmark regions
-        landmark_findings = await self._check_landmark_regions(soup, file_path)
+        landmark_findings = self._check_landmark_regions(root, file_path)
         findings.extend(landmark_findings)
         
         # Check table structure
-        table_findings = await self._check_table_structure(soup, file_path)
+        table_findings = self._check_table_structure(root, file_path)
         findings.extend(table_findings)
         
         # Check list structure
-        list_findings = await self._check_list_structure(soup, file_path)
+        list_findings = self._check_list_structure(root, file_path)
         findings.extend(list_findings)
         
         # Check form structure
-        form_findings = await self._check_form_structure(soup, file_path)
+        form_findings = self._check_form_structure(root, file_path)
         findings.extend(form_findings)
         
         return findings
     
-    async def _check_heading_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_heading_structure(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check heading structure for proper hierarchy."""
         findings = []
         
-        headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+        headings = XP_HEADINGS(root)
         
         if not headings:
             findings.append(self._create_finding(
@@ -94,11 +134,11 @@ class LayoutAgent(BaseAgent):
             return findings
         
         # Check for missing h1
-        h1_count = len(soup.find_all('h1'))
+        h1_count = len(XP_H1(root))
         if h1_count == 0:
             findings.append(self._create_finding(
                 file_path=file_path,
-                line_number=headings[0].sourceline if hasattr(headings[0], 'sourceline') else 1,
+                line_number=headings[0].sourceline,
                 selector="body",
                 details="Page missing h1 heading",
                 severity=SeverityLevel.HIGH,
@@ -107,7 +147,7 @@ class LayoutAgent(BaseAgent):
         elif h1_count > 1:
             findings.append(self._create_finding(
                 file_path=file_path,
-                line_number=headings[0].sourceline if hasattr(headings[0], 'sourceline') else 1,
+                line_number=headings[0].sourceline,
                 selector="body",
                 details=f"Page has {h1_count} h1 headings (should have only one)",
                 severity=SeverityLevel.MEDIUM,
@@ -118,8 +158,8 @@ class LayoutAgent(BaseAgent):
         prev_level = 0
         for heading in headings:
             try:
-                level = int(heading.name[1])
-                line_number = heading.sourceline if hasattr(heading, 'sourceline') else None
+                level = int(heading.tag[1])
+                line_number = heading.sourceline
                 
                 # Check for skipped heading levels
                 if level > prev_level + 1:
@@ -129,18 +169,18 @@ class LayoutAgent(BaseAgent):
                         selector=self._get_selector(heading),
                         details=f"Heading level skipped from h{prev_level} to h{level}",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(heading))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(heading))
                     ))
                 
                 # Check for empty headings
-                if not heading.get_text().strip():
+                if not heading.text_content().strip():
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
                         selector=self._get_selector(heading),
-                        details=f"Empty {heading.name} heading",
+                        details=f"Empty {heading.tag} heading",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(heading))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(heading))
                     ))
                 
                 prev_level = level
@@ -150,12 +190,12 @@ class LayoutAgent(BaseAgent):
         
         return findings
     
-    async def _check_landmark_regions(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_landmark_regions(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check for proper landmark regions."""
         findings = []
         
         # Check for main landmark
-        main_landmarks = soup.find_all(['main', '[role="main"]'])
+        main_landmarks = XP_LANDMARKS['main'](root)
         if not main_landmarks:
             findings.append(self._create_finding(
                 file_path=file_path,
@@ -167,7 +207,7 @@ class LayoutAgent(BaseAgent):
             ))
         
         # Check for navigation landmarks
-        nav_landmarks = soup.find_all(['nav', '[role="navigation"]'])
+        nav_landmarks = XP_LANDMARKS['nav'](root)
         if not nav_landmarks:
             findings.append(self._create_finding(
                 file_path=file_path,
@@ -179,7 +219,7 @@ class LayoutAgent(BaseAgent):
             ))
         
         # Check for banner landmark
-        banner_landmarks = soup.find_all(['header', '[role="banner"]'])
+        banner_landmarks = XP_LANDMARKS['header'](root)
         if not banner_landmarks:
             findings.append(self._create_finding(
                 file_path=file_path,
@@ -191,7 +231,7 @@ class LayoutAgent(BaseAgent):
             ))
         
         # Check for contentinfo landmark
-        contentinfo_landmarks = soup.find_all(['footer', '[role="contentinfo"]'])
+        contentinfo_landmarks = XP_LANDMARKS['footer'](root)
         if not contentinfo_landmarks:
             findings.append(self._create_finding(
                 file_path=file_path,
@@ -204,27 +244,27 @@ class LayoutAgent(BaseAgent):
         
         return findings
     
-    async def _check_table_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_table_structure(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check table structure for accessibility."""
         findings = []
         
-        for table in soup.find_all('table'):
+        for table in XP_TABLES(root):
             try:
-                line_number = table.sourceline if hasattr(table, 'sourceline') else None
+                line_number = table.sourceline
                 
                 # Check for missing caption
-                if not table.find('caption'):
+                if not XP_CAPTIONS(table):
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
                         selector=self._get_selector(table),
                         details="Table missing caption element",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(table))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(table))
                     ))
                 
                 # Check for missing headers
-                headers = table.find_all(['th', '[role="columnheader"]', '[role="rowheader"]'])
+                headers = XP_TABLE_HEADERS(table)
                 if not headers:
                     findings.append(self._create_finding(
                         file_path=file_path,
@@ -232,24 +272,24 @@ class LayoutAgent(BaseAgent):
                         selector=self._get_selector(table),
                         details="Table missing header cells",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(table))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(table))
                     ))
                 
                 # Check for proper header association
-                rows = table.find_all('tr')
+                rows = XP_ROWS(table)
                 if rows and headers:
                     first_row = rows[0]
-                    first_row_headers = first_row.find_all(['th', 'td'])
+                    first_row_headers = XP_CELLS(first_row)
                     
                     # Check if first row has headers
-                    if not any(cell.name == 'th' for cell in first_row_headers):
+                    if not any(cell.tag == 'th' for cell in first_row_headers):
                         findings.append(self._create_finding(
                             file_path=file_path,
                             line_number=line_number,
                             selector=self._get_selector(table),
                             details="Table first row should contain header cells",
                             severity=SeverityLevel.MEDIUM,
-                            evidence=self._create_evidence(file_path, line_number, str(table))
+                            evidence=self._create_evidence(file_path, line_number, self._element_html(table))
                         ))
                 
             except Exception as e:
@@ -257,42 +297,40 @@ class LayoutAgent(BaseAgent):
         
         return findings
     
-    async def _check_list_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_list_structure(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check list structure for accessibility."""
         findings = []
         
         # Check for proper list usage
-        for ul in soup.find_all('ul'):
+        for ul in XP_UNORDERED_LISTS(root):
             try:
-                line_number = ul.sourceline if hasattr(ul, 'sourceline') else None
-                items = ul.find_all('li')
-                
-                if not items:
+                line_number = ul.sourceline
+                # Only list items directly inside the list count; find stops
+                # at the first matching child
+                if ul.find('li') is None:
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
                         selector=self._get_selector(ul),
                         details="Unordered list contains no list items",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(ul))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(ul))
                     ))
                 
             except Exception as e:
                 logger.error(f"Error checking ul: {str(e)}")
         
-        for ol in soup.find_all('ol'):
+        for ol in XP_ORDERED_LISTS(root):
             try:
-                line_number = ol.sourceline if hasattr(ol, 'sourceline') else None
-                items = ol.find_all('li')
-                
-                if not items:
+                line_number = ol.sourceline
+                if ol.find('li') is None:
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
                         selector=self._get_selector(ol),
                         details="Ordered list contains no list items",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(ol))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(ol))
                     ))
                 
             except Exception as e:
@@ -300,18 +338,18 @@ class LayoutAgent(BaseAgent):
         
         return findings
     
-    async def _check_form_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_form_structure(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check form structure for accessibility."""
         findings = []
         
-        for form in soup.find_all('form'):
+        for form in XP_FORMS(root):
             try:
-                line_number = form.sourceline if hasattr(form, 'sourceline') else None
+                line_number = form.sourceline
                 
                 # Check for missing fieldset for related fields
-                inputs = form.find_all(['input', 'select', 'textarea'])
+                inputs = XP_FORM_INPUTS(form)
                 if len(inputs) > 1:
-                    fieldsets = form.find_all('fieldset')
+                    fieldsets = XP_FIELDSETS(form)
                     if not fieldsets:
                         findings.append(self._create_finding(
                             file_path=file_path,
@@ -319,12 +357,14 @@ class LayoutAgent(BaseAgent):
                             selector=self._get_selector(form),
                             details="Form with multiple inputs missing fieldset grouping",
                             severity=SeverityLevel.MEDIUM,
-                            evidence=self._create_evidence(file_path, line_number, str(form))
+                            evidence=self._create_evidence(file_path, line_number, self._element_html(form))
                         ))
                 
-                # Check for proper label association
+                # Check for proper label association; collect the label
+                # targets once instead of searching the form per input
+                labelled_ids = set(XP_LABEL_TARGETS(form))
                 for input_elem in inputs:
-                    input_line = input_elem.sourceline if hasattr(input_elem, 'sourceline') else None
+                    input_line = input_elem.sourceline
                     
                     # Skip hidden inputs
                     if input_elem.get('type') == 'hidden':
@@ -333,42 +373,29 @@ class LayoutAgent(BaseAgent):
                     # Check for label association
                     input_id = input_elem.get('id')
                     if input_id:
-                        label = form.find('label', {'for': input_id})
-                        if not label:
+                        if input_id not in labelled_ids:
                             findings.append(self._create_finding(
                                 file_path=file_path,
                                 line_number=input_line,
                                 selector=self._get_selector(input_elem),
                                 details="Form input missing associated label",
                                 severity=SeverityLevel.HIGH,
-                                evidence=self._create_evidence(file_path, input_line, str(input_elem))
+                                evidence=self._create_evidence(file_path, input_line, self._element_html(input_elem))
                             ))
                     else:
                         # Check for implicit label
-                        parent_label = input_elem.find_parent('label')
-                        if not parent_label:
+                        parent_label = next(input_elem.iterancestors('label'), None)
+                        if parent_label is None:
                             findings.append(self._create_finding(
                                 file_path=file_path,
                                 line_number=input_line,
                                 selector=self._get_selector(input_elem),
                                 details="Form input missing label (no id or implicit label)",
                                 severity=SeverityLevel.HIGH,
-                                evidence=self._create_evidence(file_path, input_line, str(input_elem))
+                                evidence=self._create_evidence(file_path, input_line, self._element_html(input_elem))
                             ))
                 
             except Exception as e:
                 logger.error(f"Error checking form: {str(e)}")
         
         return findings
-    
-    def _get_selector(self, element) -> str:
-        """Generate CSS selector for element."""
-        try:
-            if element.get('id'):
-                return f"#{element.get('id')}"
-            elif element.get('class'):
-                return f".{'.'.join(element.get('class'))}"
-            else:
-                return element.name
-        except:
-            return element.name if hasattr(element, 'name') else 'unknown'
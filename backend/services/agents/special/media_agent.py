@@ -5,13 +5,28 @@ MediaAgent - Detects accessibility issues in video and audio elements.
 import os
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
-from services.agents.base_agent import BaseAgent
+from services.agents.base_agent import BaseAgent, NON_CONTENT_TAGS
 import logging
 
 logger = logging.getLogger(__name__)
 
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+
+# Queries are compiled once and shared by every file
+XP_VIDEOS = etree.XPath('//video')
+XP_AUDIOS = etree.XPath('//audio')
+XP_IFRAMES = etree.XPath('//iframe')
+XP_TRACK_KINDS = etree.XPath('.//track/@kind')
+
+# Hosts whose iframes embed video players
+VIDEO_EMBED_HOSTS = ('youtube.com', 'youtu.be', 'vimeo.com')
+
+# Links whose href mentions a transcript count as the audio's text alternative
+TRANSCRIPT_HREF_PATTERN = re.compile(r'transcript', re.IGNORECASE)
+
 class MediaAgent(BaseAgent):
     """Agent for detecting accessibility issues in media elements."""
     
@@ -29,20 +44,11 @@ class MediaAgent(BaseAgent):
         
         try:
             # Find HTML files
-            html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
+            html_files = self._find_files(upload_path, HTML_EXTENSIONS)
             
-            for file_path in html_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    file_findings = await self._analyze_html_content(soup, file_path)
-                    findings.extend(file_findings)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing {file_path}: {str(e)}")
-                    findings.append(self._create_error_finding(file_path, str(e)))
+            # Files are independent, so analyze them concurrently
+            for file_findings in await self._analyze_files(html_files):
+                findings.extend(file_findings)
         
         except Exception as e:
             logger.error(f"MediaAgent analysis failed: {str(e)}")
@@ -50,37 +56,51 @@ class MediaAgent(BaseAgent):
         
         return findings
     
-    async def _analyze_html_content(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _analyze_file(self, file_path: str) -> List[Finding]:
+        """Read, parse and analyze a single HTML file."""
+        try:
+            root = self._parse_file(file_path)
+            return self._analyze_html_content(root, file_path)
+        
+        except Exception as e:
+            logger.error(f"Error analyzing {file_path}: {str(e)}")
+            return [self._create_error_finding(file_path, str(e))]
+    
+    def _parse_file(self, file_path: str) -> lxml.html.HtmlElement:
+        """Read and parse an HTML file."""
+        return self._make_tree(file_path, skip_tags=NON_CONTENT_TAGS)
+    
+    def _analyze_html_content(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Analyze HTML content for media accessibility issues."""
         findings = []
         
         # Check video elements
-        video_findings = await self._check_video_elements(soup, file_path)
+        video_findings = self._check_video_elements(root, file_path)
         findings.extend(video_findings)
         
         # Check audio elements
-        audio_findings = await self._check_audio_elements(soup, file_path)
+        audio_findings = self._check_audio_elements(root, file_path)
         findings.extend(audio_findings)
         
         # Check iframe elements (embedded media)
-        iframe_findings = await self._check_iframe_elements(soup, file_path)
+        iframe_findings = self._check_iframe_elements(root, file_path)
         findings.extend(iframe_findings)
         
         return findings
     
-    async def _check_video_elements(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_video_elements(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check video elements for accessibility issues."""
         findings = []
         
-        for video in soup.find_all('video'):
+        for video in XP_VIDEOS(root):
             try:
-                line_number = video.sourceline if hasattr(video, 'sourceline') else None
+                line_number = video.sourceline
+                
+                # Collect the track kinds once for all track-based checks
+                track_kinds = set(XP_TRACK_KINDS(video))
                 
                 # Check for missing captions
-                has_captions = (
-                    video.find('track', kind='captions') is not None or
-                    video.find('track', kind='subtitles') is not None
-                )
+                has_captions = 'captions' in track_kinds or 'subtitles' in track_kinds
                 
                 if not has_captions:
                     findings.append(self._create_finding(
@@ -89,12 +109,12 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(video),
                         details="Video element missing captions or subtitles",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(video))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(video))
                     ))
                 
                 # Check for missing audio description
                 has_audio_description = (
-                    video.find('track', kind='descriptions') is not None or
+                    'descriptions' in track_kinds or
                     video.get('aria-describedby') is not None
                 )
                 
@@ -105,7 +125,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(video),
                         details="Video element missing audio description for visual content",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(video))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(video))
                     ))
                 
                 # Check for missing controls
@@ -116,7 +136,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(video),
                         details="Video element missing controls attribute",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(video))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(video))
                     ))
                 
                 # Check for autoplay without user control
@@ -127,7 +147,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(video),
                         details="Video element autoplays without being muted",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(video))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(video))
                     ))
                 
                 # Check for missing poster image
@@ -138,7 +158,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(video),
                         details="Video element missing poster image",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(video))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(video))
                     ))
                 
             except Exception as e:
@@ -146,19 +166,23 @@ class MediaAgent(BaseAgent):
         
         return findings
     
-    async def _check_audio_elements(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_audio_elements(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check audio elements for accessibility issues."""
         findings = []
         
-        for audio in soup.find_all('audio'):
+        for audio in XP_AUDIOS(root):
             try:
-                line_number = audio.sourceline if hasattr(audio, 'sourceline') else None
+                line_number = audio.sourceline
                 
                 # Check for missing transcript or captions
+                track_kinds = set(XP_TRACK_KINDS(audio))
                 has_transcript = (
-                    audio.find('track', kind='captions') is not None or
-                    audio.find('track', kind='subtitles') is not None or
-                    audio.find_next_sibling('a', href=lambda x: x and 'transcript' in x.lower()) is not None
+                    'captions' in track_kinds or
+                    'subtitles' in track_kinds or
+                    any(
+                        TRANSCRIPT_HREF_PATTERN.search(link.get('href', ''))
+                        for link in audio.itersiblings('a')
+                    )
                 )
                 
                 if not has_transcript:
@@ -168,7 +192,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(audio),
                         details="Audio element missing transcript or captions",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(audio))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(audio))
                     ))
                 
                 # Check for missing controls
@@ -179,7 +203,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(audio),
                         details="Audio element missing controls attribute",
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(audio))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(audio))
                     ))
                 
                 # Check for autoplay
@@ -190,7 +214,7 @@ class MediaAgent(BaseAgent):
                         selector=self._get_selector(audio),
                         details="Audio element has autoplay attribute",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(audio))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(audio))
                     ))
                 
             except Exception as e:
@@ -198,48 +222,38 @@ class MediaAgent(BaseAgent):
         
         return findings
     
-    async def _check_iframe_elements(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_iframe_elements(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Check iframe elements for embedded media accessibility."""
         findings = []
         
-        for iframe in soup.find_all('iframe'):
+        for iframe in XP_IFRAMES(root):
             try:
-                line_number = iframe.sourceline if hasattr(iframe, 'sourceline') else None
+                line_number = iframe.sourceline
                 src = iframe.get('src', '')
+                title = iframe.get('title')
+                aria_label = iframe.get('aria-label')
+                is_video_embed = any(host in src for host in VIDEO_EMBED_HOSTS)
                 
-                # Check for YouTube/Vimeo embeds without proper accessibility
-                if 'youtube.com' in src or 'youtu.be' in src or 'vimeo.com' in src:
-                    # Check for missing title
-                    if not iframe.get('title'):
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(iframe),
-                            details="Embedded video iframe missing title attribute",
-                            severity=SeverityLevel.MEDIUM,
-                            evidence=self._create_evidence(file_path, line_number, str(iframe))
-                        ))
-                    
-                    # Check for missing aria-label
-                    if not iframe.get('aria-label') and not iframe.get('title'):
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(iframe),
-                            details="Embedded video iframe missing accessible name",
-                            severity=SeverityLevel.MEDIUM,
-                            evidence=self._create_evidence(file_path, line_number, str(iframe))
-                        ))
+                # Report at most one naming issue per iframe, the most
+                # specific one that applies
+                if not title and not aria_label:
+                    details = (
+                        "Embedded video iframe missing accessible name" if is_video_embed
+                        else "Iframe element missing title or aria-label"
+                    )
+                elif not title and is_video_embed:
+                    details = "Embedded video iframe missing title attribute"
+                else:
+                    details = None
                 
-                # Check for missing title on all iframes
-                if not iframe.get('title') and not iframe.get('aria-label'):
+                if details:
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
                         selector=self._get_selector(iframe),
-                        details="Iframe element missing title or aria-label",
+                        details=details,
                         severity=SeverityLevel.MEDIUM,
-                        evidence=self._create_evidence(file_path, line_number, str(iframe))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(iframe))
                     ))
                 
             except Exception as e:
@@ -247,16 +261,19 @@ class MediaAgent(BaseAgent):
         
         return findings
     
-    def _get_selector(self, element) -> str:
-        """Generate CSS selector for element."""
-        try:
-            if element.get('id'):
-                return f"#{element.get('id')}"
-            elif element.get('class'):
-                return f".{'.'.join(element.get('class'))}"
-            elif element.get('src'):
-                return f"{element.name}[src='{element.get('src')}']"
-            else:
-                return element.name
-        except:
-            return element.name if hasattr(element, 'name') else 'unknown'
+    def _build_selector(self, element: lxml.html.HtmlElement) -> str:
+        """Build the CSS selector for element, using src when it has no id or class."""
+        attrib = element.attrib
+        if not attrib:
+            # Most reported elements have no attributes at all
+            return element.tag
+        element_id = attrib.get('id')
+        if element_id:
+            return f"#{element_id}"
+        classes = attrib.get('class', '').split()
+        if classes:
+            return f".{'.'.join(classes)}"
+        src = attrib.get('src')
+        if src:
+            return f"{element.tag}[src='{src}']"
+        return element.tag
@@ -5,13 +5,22 @@ NavigationConsistencyAgent - Detects navigation consistency issues.
 import os
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
-from services.agents.base_agent import BaseAgent
+from services.agents.base_agent import BaseAgent, NON_CONTENT_TAGS
 import logging
 
 logger = logging.getLogger(__name__)
 
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+
+# Every element the checks read, collected in one descent
+XP_NAVIGATION_ELEMENTS = etree.XPath('//nav | //a | //form | //form//input')
+
+# Forms using more distinct input types than this are reported
+MAX_INPUT_TYPES = 5
+
 class NavigationConsistencyAgent(BaseAgent):
     """Agent for detecting navigation consistency issues."""
     
@@ -28,20 +37,11 @@ class NavigationConsistencyAgent(BaseAgent):
         findings = []
         
         try:
-            html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
+            html_files = self._find_files(upload_path, HTML_EXTENSIONS)
             
-            for file_path in html_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    file_findings = await self._analyze_html_content(soup, file_path)
-                    findings.extend(file_findings)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing {file_path}: {str(e)}")
-                    findings.append(self._create_error_finding(file_path, str(e)))
+            # Files are independent, so analyze them concurrently
+            for file_findings in await self._analyze_files(html_files):
+                findings.extend(file_findings)
         
         except Exception as e:
             logger.error(f"NavigationConsistencyAgent analysis failed: {str(e)}")
@@ -49,30 +49,42 @@ class NavigationConsistencyAgent(BaseAgent):
         
         return findings
     
-    async def _analyze_html_content(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _analyze_file(self, file_path: str) -> List[Finding]:
+        """Parse and analyze a single HTML file."""
+        try:
+            root = self._make_tree(file_path, skip_tags=NON_CONTENT_TAGS)
+            return self._analyze_html_content(root, file_path)
+        
+        except Exception as e:
+            logger.error(f"Error analyzing {file_path}: {str(e)}")
+            return [self._create_error_finding(file_path, str(e))]
+    
+    def _analyze_html_content(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Analyze HTML content for navigation consistency issues."""
         findings = []
         
+        buckets = self._bucket_by_tag(XP_NAVIGATION_ELEMENTS(root))
+        
         # Check navigation structure
-        nav_findings = await self._check_navigation_structure(soup, file_path)
+        nav_findings = self._check_navigation_structure(buckets, file_path)
         findings.extend(nav_findings)
         
         # Check link consistency
-        link_findings = await self._check_link_consistency(soup, file_path)
+        link_findings = self._check_link_consistency(buckets, file_path)
         findings.extend(link_findings)
         
         # Check form consistency
-        form_findings = await self._check_form_consistency(soup, file_path)
+        form_findings = self._check_form_consistency(buckets, file_path)
         findings.extend(form_findings)
         
         return findings
     
-    async def _check_navigation_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_navigation_structure(self, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check navigation structure for consistency."""
         findings = []
         
         # Check for multiple navigation areas
-        nav_elements = soup.find_all('nav')
+        nav_elements = buckets['nav']
         if len(nav_elements) > 1:
             findings.append(self._create_finding(
                 file_path=file_path,
@@ -96,76 +108,67 @@ class NavigationConsistencyAgent(BaseAgent):
         
         return findings
     
-    async def _check_link_consistency(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_link_consistency(self, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check link consistency."""
         findings = []
         
         # Check for duplicate link text
-        links = soup.find_all('a')
-        link_texts = {}
+        links = buckets['a']
+        # Maps each text to its first link; only texts seen again are
+        # promoted to a list, so unique texts allocate nothing extra
+        link_seen = {}
         
         for link in links:
-            try:
-                text = link.get_text().strip()
-                if text and len(text) > 3:  # Only check meaningful text
-                    if text in link_texts:
-                        link_texts[text].append(link)
-                    else:
-                        link_texts[text] = [link]
-                
-            except Exception as e:
-                logger.error(f"Error checking link text: {str(e)}")
+            text = link.text_content().strip()
+            if len(text) <= 3:  # Only check meaningful text
+                continue
+            seen = link_seen.get(text)
+            if seen is None:
+                link_seen[text] = link
+            elif isinstance(seen, list):
+                seen.append(link)
+            else:
+                link_seen[text] = [seen, link]
         
         # Check for duplicate link texts
-        for text, link_list in link_texts.items():
-            if len(link_list) > 1:
-                line_number = link_list[0].sourceline if hasattr(link_list[0], 'sourceline') else None
+        for text, seen in link_seen.items():
+            if isinstance(seen, list):
+                first_link = seen[0]
+                line_number = first_link.sourceline
                 findings.append(self._create_finding(
                     file_path=file_path,
                     line_number=line_number,
-                    selector=self._get_selector(link_list[0]),
+                    selector=self._get_selector(first_link),
                     details=f"Multiple links with same text '{text}' - may be confusing",
                     severity=SeverityLevel.MEDIUM,
-                    evidence=self._create_evidence(file_path, line_number, str(link_list[0]))
+                    evidence=self._create_evidence(file_path, line_number, self._element_html(first_link))
                 ))
         
         return findings
     
-    async def _check_form_consistency(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_form_consistency(self, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check form consistency."""
         findings = []
         
         # Check for consistent form styling
-        forms = soup.find_all('form')
+        forms = buckets['form']
         if len(forms) > 1:
-            # Check for consistent input types
+            # Check for consistent input types, stopping as soon as there
+            # are too many
             input_types = set()
-            for form in forms:
-                inputs = form.find_all('input')
-                for input_elem in inputs:
-                    input_type = input_elem.get('type', 'text')
-                    input_types.add(input_type)
+            for input_elem in buckets['input']:
+                input_types.add(input_elem.get('type', 'text'))
+                if len(input_types) > MAX_INPUT_TYPES:
+                    break
             
-            if len(input_types) > 5:  # Too many different input types
+            if len(input_types) > MAX_INPUT_TYPES:
                 findings.append(self._create_finding(
                     file_path=file_path,
                     line_number=1,
                     selector="body",
                     details="Forms use many different input types - consider consistency",
                     severity=SeverityLevel.LOW,
-                    evidence=self._create_evidence(file_path, 1, f"Found {len(input_types)} input types")
+                    evidence=self._create_evidence(file_path, 1, f"Found more than {MAX_INPUT_TYPES} input types")
                 ))
         
         return findings
-    
-    def _get_selector(self, element) -> str:
-        """Generate CSS selector for element."""
-        try:
-            if element.get('id'):
-                return f"#{element.get('id')}"
-            elif element.get('class'):
-                return f".{'.'.join(element.get('class'))}"
-            else:
-                return element.name
-        except:
-            return element.name if hasattr(element, 'name') else 'unknown'
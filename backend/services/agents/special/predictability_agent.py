@@ -5,13 +5,47 @@ PredictabilityAgent - Detects predictability and consistency issues.
 import os
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
-from services.agents.base_agent import BaseAgent
+from services.agents.base_agent import BaseAgent, NON_CONTENT_TAGS
 import logging
 
 logger = logging.getLogger(__name__)
 
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+
+BREADCRUMB_PATTERN = re.compile(r'breadcrumb', re.IGNORECASE)
+
+# Inputs whose onchange handler submits the form, matched case-insensitively
+AUTOSUBMIT_INPUT_PREDICATE = (
+    "input[contains(translate(@onchange, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submit')]"
+)
+
+# Every element the checks read, collected in one descent; forms are only
+# collected when they hold an auto-submitting input
+XP_PREDICTABILITY_ELEMENTS = etree.XPath(
+    f"//form[.//{AUTOSUBMIT_INPUT_PREDICATE}] | //button | //a | //nav | //title"
+    " | //meta[@http-equiv='refresh']"
+)
+XP_AUTOSUBMIT_INPUTS = etree.XPath(f'.//{AUTOSUBMIT_INPUT_PREDICATE}')
+
+# Whether any element's aria-label mentions breadcrumbs
+XP_HAS_BREADCRUMB_LABEL = etree.XPath(
+    "boolean(//*[re:test(@aria-label, 'breadcrumb', 'i')])",
+    namespaces={'re': 'http://exslt.org/regular-expressions'}
+)
+
+def _element_string(element: lxml.html.HtmlElement):
+    """Return the element's only string, like bs4's Tag.string.
+    
+    Wrappers with a single child element and no text of their own are
+    looked through; any other mix of content has no single string.
+    """
+    while len(element) == 1 and not element.text and not element[0].tail:
+        element = element[0]
+    return element.text if len(element) == 0 else None
+
 class PredictabilityAgent(BaseAgent):
     """Agent for detecting predictability and consistency issues."""
     
@@ -28,20 +62,11 @@ class PredictabilityAgent(BaseAgent):
         findings = []
         
         try:
-            html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
+            html_files = self._find_files(upload_path, HTML_EXTENSIONS)
             
-            for file_path in html_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    file_findings = await self._analyze_html_content(soup, file_path)
-                    findings.extend(file_findings)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing {file_path}: {str(e)}")
-                    findings.append(self._create_error_finding(file_path, str(e)))
+            # Files are independent, so analyze them concurrently
+            for file_findings in await self._analyze_files(html_files):
+                findings.extend(file_findings)
         
         except Exception as e:
             logger.error(f"PredictabilityAgent analysis failed: {str(e)}")
@@ -49,56 +74,65 @@ class PredictabilityAgent(BaseAgent):
         
         return findings
     
-    async def _analyze_html_content(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _analyze_file(self, file_path: str) -> List[Finding]:
+        """Parse and analyze a single HTML file."""
+        try:
+            root = self._make_tree(file_path, skip_tags=NON_CONTENT_TAGS)
+            return self._analyze_html_content(root, file_path)
+        
+        except Exception as e:
+            logger.error(f"Error analyzing {file_path}: {str(e)}")
+            return [self._create_error_finding(file_path, str(e))]
+    
+    def _analyze_html_content(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Analyze HTML content for predictability issues."""
         findings = []
         
+        buckets = self._bucket_by_tag(XP_PREDICTABILITY_ELEMENTS(root))
+        
         # Check for unexpected changes
-        change_findings = await self._check_unexpected_changes(soup, file_path)
+        change_findings = self._check_unexpected_changes(buckets, file_path)
         findings.extend(change_findings)
         
         # Check for consistent behavior
-        behavior_findings = await self._check_consistent_behavior(soup, file_path)
+        behavior_findings = self._check_consistent_behavior(buckets, file_path)
         findings.extend(behavior_findings)
         
         # Check for clear navigation
-        navigation_findings = await self._check_clear_navigation(soup, file_path)
+        navigation_findings = self._check_clear_navigation(root, buckets, file_path)
         findings.extend(navigation_findings)
         
         return findings
     
-    async def _check_unexpected_changes(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_unexpected_changes(self, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check for unexpected changes that might confuse users."""
         findings = []
         
         # Check for auto-submit forms
-        forms = soup.find_all('form')
+        forms = buckets['form']
         for form in forms:
             try:
-                line_number = form.sourceline if hasattr(form, 'sourceline') else None
+                line_number = form.sourceline
                 
                 # Check for auto-submit on change
-                inputs = form.find_all('input', attrs={'onchange': True})
-                for input_elem in inputs:
-                    onchange = input_elem.get('onchange', '')
-                    if 'submit' in onchange.lower():
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(form),
-                            details="Form auto-submits on input change - may be unexpected",
-                            severity=SeverityLevel.MEDIUM,
-                            evidence=self._create_evidence(file_path, line_number, str(form))
-                        ))
+                for input_elem in XP_AUTOSUBMIT_INPUTS(form):
+                    findings.append(self._create_finding(
+                        file_path=file_path,
+                        line_number=line_number,
+                        selector=self._get_selector(form),
+                        details="Form auto-submits on input change - may be unexpected",
+                        severity=SeverityLevel.MEDIUM,
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(form))
+                    ))
                 
             except Exception as e:
                 logger.error(f"Error checking auto-submit forms: {str(e)}")
         
         # Check for unexpected redirects
-        meta_refresh = soup.find('meta', attrs={'http-equiv': 'refresh'})
-        if meta_refresh:
+        meta_refresh = next(iter(buckets['meta']), None)
+        if meta_refresh is not None:
             try:
-                line_number = meta_refresh.sourceline if hasattr(meta_refresh, 'sourceline') else None
+                line_number = meta_refresh.sourceline
                 content = meta_refresh.get('content', '')
                 
                 if 'url=' in content.lower():
@@ -108,7 +142,7 @@ class PredictabilityAgent(BaseAgent):
                         selector="meta[http-equiv='refresh']",
                         details="Page redirects automatically - may be unexpected",
                         severity=SeverityLevel.HIGH,
-                        evidence=self._create_evidence(file_path, line_number, str(meta_refresh))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(meta_refresh))
                     ))
                 
             except Exception as e:
@@ -116,51 +150,50 @@ class PredictabilityAgent(BaseAgent):
         
         return findings
     
-    async def _check_consistent_behavior(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_consistent_behavior(self, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check for consistent behavior patterns."""
         findings = []
         
         # Check for consistent button styles
-        buttons = soup.find_all('button')
+        buttons = buckets['button']
         if len(buttons) > 1:
+            # Too many different styles once they outnumber half the buttons;
+            # stop collecting as soon as that is certain
+            max_styles = len(buttons) / 2
             button_styles = set()
             for button in buttons:
-                style = button.get('style', '')
+                style = button.get('style')
                 if style:
                     button_styles.add(style)
+                    if len(button_styles) > max_styles:
+                        break
             
-            if len(button_styles) > len(buttons) / 2:  # Too many different styles
+            if len(button_styles) > max_styles:
                 findings.append(self._create_finding(
                     file_path=file_path,
                     line_number=1,
                     selector="body",
                     details="Buttons have inconsistent styling - consider consistency",
                     severity=SeverityLevel.LOW,
-                    evidence=self._create_evidence(file_path, 1, f"Found {len(button_styles)} different button styles")
+                    evidence=self._create_evidence(file_path, 1, f"Found at least {len(button_styles)} different button styles")
                 ))
         
         # Check for consistent link behavior
-        links = soup.find_all('a')
+        links = buckets['a']
         if len(links) > 1:
-            # Check for mixed link types
+            # Count mixed link types and unmarked external links in one pass
             external_links = 0
-            internal_links = 0
+            unmarked_external = 0
             
             for link in links:
-                href = link.get('href', '')
-                if href.startswith('http') and not href.startswith('#'):
+                if link.get('href', '').startswith('http'):
                     external_links += 1
-                else:
-                    internal_links += 1
+                    if link.get('target') != '_blank':
+                        unmarked_external += 1
+            internal_links = len(links) - external_links
             
             if external_links > 0 and internal_links > 0:
                 # Check if external links are properly marked
-                unmarked_external = 0
-                for link in links:
-                    href = link.get('href', '')
-                    if href.startswith('http') and not link.get('target') == '_blank':
-                        unmarked_external += 1
-                
                 if unmarked_external > 0:
                     findings.append(self._create_finding(
                         file_path=file_path,
@@ -173,16 +206,17 @@ class PredictabilityAgent(BaseAgent):
         
         return findings
     
-    async def _check_clear_navigation(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_clear_navigation(self, root: lxml.html.HtmlElement, buckets: Dict[str, List[lxml.html.HtmlElement]], file_path: str) -> List[Finding]:
         """Check for clear navigation patterns."""
         findings = []
         
         # Check for breadcrumbs
-        breadcrumbs = soup.find_all(attrs={'aria-label': re.compile(r'breadcrumb', re.IGNORECASE)})
-        if not breadcrumbs:
+        if not XP_HAS_BREADCRUMB_LABEL(root):
             # Check for common breadcrumb patterns
-            breadcrumb_patterns = soup.find_all('nav', string=re.compile(r'breadcrumb', re.IGNORECASE))
-            if not breadcrumb_patterns:
+            has_breadcrumb_nav = any(
+                BREADCRUMB_PATTERN.search(_element_string(nav) or '') for nav in buckets['nav']
+            )
+            if not has_breadcrumb_nav:
                 findings.append(self._create_finding(
                     file_path=file_path,
                     line_number=1,
@@ -193,9 +227,9 @@ class PredictabilityAgent(BaseAgent):
                 ))
         
         # Check for clear page titles
-        title = soup.find('title')
-        if title:
-            title_text = title.get_text().strip()
+        title = next(iter(buckets['title']), None)
+        if title is not None:
+            title_text = title.text_content().strip()
             if not title_text or len(title_text) < 3:
                 findings.append(self._create_finding(
                     file_path=file_path,
@@ -203,19 +237,7 @@ class PredictabilityAgent(BaseAgent):
                     selector="title",
                     details="Page title is missing or too short",
                     severity=SeverityLevel.MEDIUM,
-                    evidence=self._create_evidence(file_path, 1, str(title))
+                    evidence=self._create_evidence(file_path, 1, self._element_html(title))
                 ))
         
         return findings
-    
-    def _get_selector(self, element) -> str:
-        """Generate CSS selector for element."""
-        try:
-            if element.get('id'):
-                return f"#{element.get('id')}"
-            elif element.get('class'):
-                return f".{'.'.join(element.get('class'))}"
-            else:
-                return element.name
-        except:
-            return element.name if hasattr(element, 'name') else 'unknown'
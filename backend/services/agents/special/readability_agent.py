@@ -5,13 +5,70 @@ ReadabilityAgent - Detects readability and text clarity issues.
 import os
 import re
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
-from services.agents.base_agent import BaseAgent
+from services.agents.base_agent import BaseAgent, NON_CONTENT_TAGS
 import logging
 
 logger = logging.getLogger(__name__)
 
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+
+# Elements whose text is checked for clarity and sentence length; p is
+# also checked for paragraph length
+TEXT_ELEMENT_TAGS = frozenset(('p', 'div', 'span', 'li'))
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+
+# Text elements and headings, collected in one descent
+XP_READABILITY_ELEMENTS = etree.XPath(' | '.join(
+    f'//{tag}' for tag in ('p', 'div', 'span', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+))
+
+# Vague or filler wording that makes text harder to follow, or repeated
+# pronouns whose referent is unclear, scanned as one alternation
+UNCLEAR_TEXT_PATTERN = re.compile(
+    r'\b(?:click here|read more|see more|learn more'
+    r'|obviously|clearly|of course|naturally'
+    r'|etc|etc\.|and so on|and more)\b'
+    r'|\b(?:this|that|it|these|those)\b.*\b(?:this|that|it|these|those)\b',
+    re.IGNORECASE
+)
+
+# Headings that are just numbers, all caps, all lowercase or blank. On
+# stripped, non-empty text at most one of these can match, so they are
+# tested as one alternation
+UNCLEAR_HEADING_PATTERN = re.compile(
+    r'^(?:\d+\.?\s*'  # Just numbers
+    r'|[A-Z\s]+'  # All caps
+    r'|[a-z\s]+'  # All lowercase
+    r'|\s*)$'  # Empty or whitespace
+)
+
+# Runs of text between sentence-ending punctuation
+SENTENCE_PATTERN = re.compile(r'[^.!?]+')
+
+# Sentences longer than this many characters are reported
+MAX_SENTENCE_LENGTH = 100
+
+def _element_text(element: lxml.html.HtmlElement) -> str:
+    """Return the element's text with indentation between tags collapsed.
+    
+    Whitespace-only runs become a single newline or space, so source
+    formatting does not count towards sentence and paragraph lengths.
+    """
+    if len(element) == 0:
+        # Leaf elements, such as the empty containers of grid and flex
+        # layouts, hold at most their own text; skip the itertext walk
+        text = element.text
+        if not text or not text.isspace():
+            return text or ''
+        return '\n' if '\n' in text else ' '
+    return ''.join(
+        piece if not piece.isspace() else ('\n' if '\n' in piece else ' ')
+        for piece in element.itertext()
+    )
+
 class ReadabilityAgent(BaseAgent):
     """Agent for detecting readability and text clarity issues."""
     
@@ -28,20 +85,11 @@ class ReadabilityAgent(BaseAgent):
         findings = []
         
         try:
-            html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
+            html_files = self._find_files(upload_path, HTML_EXTENSIONS)
             
-            for file_path in html_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    file_findings = await self._analyze_html_content(soup, file_path)
-                    findings.extend(file_findings)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing {file_path}: {str(e)}")
-                    findings.append(self._create_error_finding(file_path, str(e)))
+            # Files are independent, so analyze them concurrently
+            for file_findings in await self._analyze_files(html_files):
+                findings.extend(file_findings)
         
         except Exception as e:
             logger.error(f"ReadabilityAgent analysis failed: {str(e)}")
@@ -49,135 +97,87 @@ class ReadabilityAgent(BaseAgent):
         
         return findings
     
-    async def _analyze_html_content(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _analyze_file(self, file_path: str) -> List[Finding]:
+        """Parse and analyze a single HTML file."""
+        try:
+            root = self._make_tree(file_path, skip_tags=NON_CONTENT_TAGS)
+            return self._analyze_html_content(root, file_path)
+        
+        except Exception as e:
+            logger.error(f"Error analyzing {file_path}: {str(e)}")
+            return [self._create_error_finding(file_path, str(e))]
+    
+    def _analyze_html_content(self, root: lxml.html.HtmlElement, file_path: str) -> List[Finding]:
         """Analyze HTML content for readability issues."""
         findings = []
         
-        # Check text clarity
-        clarity_findings = await self._check_text_clarity(soup, file_path)
-        findings.extend(clarity_findings)
-        
-        # Check sentence length
-        sentence_findings = await self._check_sentence_length(soup, file_path)
-        findings.extend(sentence_findings)
+        buckets = self._bucket_by_tag(
+            XP_READABILITY_ELEMENTS(root),
+            groups={'text': TEXT_ELEMENT_TAGS, 'headings': HEADING_TAGS}
+        )
         
-        # Check paragraph length
-        paragraph_findings = await self._check_paragraph_length(soup, file_path)
-        findings.extend(paragraph_findings)
+        # Check text clarity, sentence length and paragraph length
+        text_findings = self._check_text_elements(buckets['text'], file_path)
+        findings.extend(text_findings)
         
         # Check heading structure
-        heading_findings = await self._check_heading_structure(soup, file_path)
+        heading_findings = self._check_heading_structure(buckets['headings'], file_path)
         findings.extend(heading_findings)
         
         return findings
     
-    async def _check_text_clarity(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
-        """Check text clarity and readability."""
+    def _check_text_elements(self, elements: List[lxml.html.HtmlElement], file_path: str) -> List[Finding]:
+        """Check text clarity, sentence length and paragraph length in one pass."""
         findings = []
         
-        # Check for unclear text patterns
-        text_elements = soup.find_all(['p', 'div', 'span', 'li'])
-        for element in text_elements:
+        for element in elements:
             try:
-                text = element.get_text().strip()
-                if not text or len(text) < 10:
+                # Extract the text once for every check below
+                text = _element_text(element).strip()
+                if not text:
                     continue
                 
-                line_number = element.sourceline if hasattr(element, 'sourceline') else None
+                line_number = element.sourceline
                 
                 # Check for unclear text patterns
-                unclear_patterns = [
-                    r'\b(click here|read more|see more|learn more)\b',
-                    r'\b(this|that|it|these|those)\b.*\b(this|that|it|these|those)\b',
-                    r'\b(obviously|clearly|of course|naturally)\b',
-                    r'\b(etc|etc\.|and so on|and more)\b'
-                ]
-                
-                for pattern in unclear_patterns:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(element),
-                            details=f"Unclear text pattern detected: {text[:50]}...",
-                            severity=SeverityLevel.LOW,
-                            evidence=self._create_evidence(file_path, line_number, str(element))
-                        ))
-                
-            except Exception as e:
-                logger.error(f"Error checking text clarity: {str(e)}")
-        
-        return findings
-    
-    async def _check_sentence_length(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
-        """Check sentence length for readability."""
-        findings = []
-        
-        text_elements = soup.find_all(['p', 'div', 'span', 'li'])
-        for element in text_elements:
-            try:
-                text = element.get_text().strip()
-                if not text:
-                    continue
-                
-                line_number = element.sourceline if hasattr(element, 'sourceline') else None
+                if len(text) >= 10 and UNCLEAR_TEXT_PATTERN.search(text):
+                    findings.append(self._create_finding(
+                        file_path=file_path,
+                        line_number=line_number,
+                        selector=self._get_selector(element),
+                        details=f"Unclear text pattern detected: {text[:50]}...",
+                        severity=SeverityLevel.LOW,
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(element))
+                    ))
                 
-                # Split into sentences
-                sentences = re.split(r'[.!?]+', text)
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence or len(sentence) < 10:
+                # Check for very long sentences; a span no longer than the
+                # limit cannot hold one, so only longer spans are sliced out
+                for match in SENTENCE_PATTERN.finditer(text):
+                    if match.end() - match.start() <= MAX_SENTENCE_LENGTH:
                         continue
-                    
-                    # Check for very long sentences
-                    if len(sentence) > 100:
+                    sentence = match.group().strip()
+                    if len(sentence) > MAX_SENTENCE_LENGTH:
                         findings.append(self._create_finding(
                             file_path=file_path,
                             line_number=line_number,
                             selector=self._get_selector(element),
                             details=f"Very long sentence detected: {sentence[:50]}...",
                             severity=SeverityLevel.LOW,
-                            evidence=self._create_evidence(file_path, line_number, str(element))
-                        ))
-                    
-                    # Check for very short sentences
-                    elif len(sentence) < 5:
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(element),
-                            details=f"Very short sentence detected: {sentence}",
-                            severity=SeverityLevel.LOW,
-                            evidence=self._create_evidence(file_path, line_number, str(element))
+                            evidence=self._create_evidence(file_path, line_number, self._element_html(element))
                         ))
                 
-            except Exception as e:
-                logger.error(f"Error checking sentence length: {str(e)}")
-        
-        return findings
-    
-    async def _check_paragraph_length(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
-        """Check paragraph length for readability."""
-        findings = []
-        
-        paragraphs = soup.find_all('p')
-        for paragraph in paragraphs:
-            try:
-                text = paragraph.get_text().strip()
-                if not text:
+                if element.tag != 'p':
                     continue
                 
-                line_number = paragraph.sourceline if hasattr(paragraph, 'sourceline') else None
-                
                 # Check for very long paragraphs
                 if len(text) > 500:
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
-                        selector=self._get_selector(paragraph),
+                        selector=self._get_selector(element),
                         details=f"Very long paragraph detected ({len(text)} characters) - consider breaking up",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(paragraph))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(element))
                     ))
                 
                 # Check for very short paragraphs
@@ -185,30 +185,28 @@ class ReadabilityAgent(BaseAgent):
                     findings.append(self._create_finding(
                         file_path=file_path,
                         line_number=line_number,
-                        selector=self._get_selector(paragraph),
+                        selector=self._get_selector(element),
                         details=f"Very short paragraph detected - consider combining or expanding",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(paragraph))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(element))
                     ))
                 
             except Exception as e:
-                logger.error(f"Error checking paragraph length: {str(e)}")
+                logger.error(f"Error checking text element: {str(e)}")
         
         return findings
     
-    async def _check_heading_structure(self, soup: BeautifulSoup, file_path: str) -> List[Finding]:
+    def _check_heading_structure(self, headings: List[lxml.html.HtmlElement], file_path: str) -> List[Finding]:
         """Check heading structure for readability."""
         findings = []
         
-        headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-        
         for heading in headings:
             try:
-                text = heading.get_text().strip()
+                text = _element_text(heading).strip()
                 if not text:
                     continue
                 
-                line_number = heading.sourceline if hasattr(heading, 'sourceline') else None
+                line_number = heading.sourceline
                 
                 # Check for very long headings
                 if len(text) > 100:
@@ -218,7 +216,7 @@ class ReadabilityAgent(BaseAgent):
                         selector=self._get_selector(heading),
                         details=f"Very long heading detected: {text[:50]}...",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(heading))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(heading))
                     ))
                 
                 # Check for very short headings
@@ -229,41 +227,21 @@ class ReadabilityAgent(BaseAgent):
                         selector=self._get_selector(heading),
                         details=f"Very short heading detected: {text}",
                         severity=SeverityLevel.LOW,
-                        evidence=self._create_evidence(file_path, line_number, str(heading))
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(heading))
                     ))
                 
                 # Check for unclear headings
-                unclear_heading_patterns = [
-                    r'^\d+\.?\s*$',  # Just numbers
-                    r'^[A-Z\s]+$',  # All caps
-                    r'^[a-z\s]+$',  # All lowercase
-                    r'^\s*$'  # Empty or whitespace
-                ]
-                
-                for pattern in unclear_heading_patterns:
-                    if re.match(pattern, text):
-                        findings.append(self._create_finding(
-                            file_path=file_path,
-                            line_number=line_number,
-                            selector=self._get_selector(heading),
-                            details=f"Unclear heading detected: {text}",
-                            severity=SeverityLevel.LOW,
-                            evidence=self._create_evidence(file_path, line_number, str(heading))
-                        ))
+                if UNCLEAR_HEADING_PATTERN.match(text):
+                    findings.append(self._create_finding(
+                        file_path=file_path,
+                        line_number=line_number,
+                        selector=self._get_selector(heading),
+                        details=f"Unclear heading detected: {text}",
+                        severity=SeverityLevel.LOW,
+                        evidence=self._create_evidence(file_path, line_number, self._element_html(heading))
+                    ))
                 
             except Exception as e:
                 logger.error(f"Error checking heading structure: {str(e)}")
         
         return findings
-    
-    def _get_selector(self, element) -> str:
-        """Generate CSS selector for element."""
-        try:
-            if element.get('id'):
-                return f"#{element.get('id')}"
-            elif element.get('class'):
-                return f".{'.'.join(element.get('class'))}"
-            else:
-                return element.name
-        except:
-            return element.name if hasattr(element, 'name') else 'unknown'
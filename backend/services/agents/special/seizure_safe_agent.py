@@ -5,16 +5,149 @@ SeizureSafeAgent - Evaluates seizure safety compliance for WCAG 2.2.
 import os
 import re
 from typing import List, Dict, Any, Optional
-from pathlib import Path
-from bs4 import BeautifulSoup
-import tinycss2
-from tinycss2 import parse_stylesheet
 
 from models.schemas import Finding, Evidence, SeverityLevel, ConfidenceLevel, CriterionType
 from utils.flash_metrics import analyze_animation_safety, FlashEvent
 from utils.wcag_constants import FLASH_THRESHOLDS
 from utils.id_gen import generate_finding_id
-from services.agents.base_agent import BaseAgent
+from bs4 import SoupStrainer
+from services.agents.base_agent import BaseAgent, EVIDENCE_HTML_MAX_LENGTH
+
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+CSS_EXTENSIONS = ('.css', '.scss', '.sass')
+JS_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx')
+QML_EXTENSIONS = ('.qml',)
+SEIZURE_EXTENSIONS = HTML_EXTENSIONS + CSS_EXTENSIONS + JS_EXTENSIONS + QML_EXTENSIONS
+
+# Inline style properties that animate an element; animation also covers
+# the animation-* longhands
+ANIMATION_STYLE_PROPERTIES = ('animation', 'transition', 'transform', 'opacity', 'visibility')
+
+# Words in a class name that suggest animation
+ANIMATION_CLASS_KEYWORDS = (
+    'animate', 'animation', 'flash', 'blink', 'pulse', 'fade', 'slide',
+    'bounce', 'shake', 'wiggle', 'rotate', 'scale', 'zoom'
+)
+
+# Class names that mark an element as animated
+ANIMATION_CLASS_PATTERN = re.compile(r'animate|flash|blink|pulse')
+
+# Animation-related code patterns in JavaScript files, each with a lowercase
+# literal it cannot match without; files lacking the literal skip the scan.
+# Matches are reported by the first number in them, so only patterns whose
+# matches can hold a number are scanned for (requestAnimationFrame, jQuery
+# animate, transition/transform calls and visibility changes never do)
+JS_ANIMATION_PATTERNS = tuple((keyword, re.compile(pattern, re.IGNORECASE)) for keyword, pattern in (
+    ('setinterval', r'setInterval\s*\([^,]+,\s*(\d+)'),  # setInterval with timing
+    ('settimeout', r'setTimeout\s*\([^,]+,\s*(\d+)'),    # setTimeout with timing
+    ('opacity', r'opacity\s*:\s*[\d.]+'),                 # Opacity changes
+))
+
+# Infinite animation loops in QML files. Of the QML animation constructs
+# only these are reported, so they are the only ones scanned for
+QML_INFINITE_LOOP_PATTERN = re.compile(r'loops\s*:\s*Animation\.Infinite', re.IGNORECASE)
+
+# First number in a matched snippet, read as its timing in milliseconds
+TIMING_PATTERN = re.compile(r'(\d+)')
+
+# Severity of each violation level; anything else is reported as low
+VIOLATION_SEVERITY = {
+    "high": SeverityLevel.HIGH,
+    "medium": SeverityLevel.MEDIUM
+}
+
+# Violations whose details never vary. Findings copy their metrics, so
+# one dict each is shared by every finding
+AUTOPLAY_VIDEO_VIOLATION = {
+    "type": "autoplay_video",
+    "severity": "high",
+    "description": "Autoplay video may cause seizures",
+    "criterion": "2.3.1",
+    "frequency": "unknown",
+    "duration": "unknown"
+}
+GIF_IMAGE_VIOLATION = {
+    "type": "gif_image",
+    "severity": "medium",
+    "description": "Animated GIF may cause seizures",
+    "criterion": "2.3.1",
+    "frequency": "unknown",
+    "duration": "unknown"
+}
+INFINITE_QML_ANIMATION_VIOLATION = {
+    "type": "infinite_qml_animation",
+    "severity": "high",
+    "description": "Infinite QML animation may cause seizures",
+    "criterion": "2.3.1",
+    "frequency": "continuous",
+    "duration": "unknown"
+}
+
+def _read_text(file_path: str) -> str:
+    """Read a file as UTF-8 text, dropping undecodable bytes.
+    
+    Reads the bytes in one call and decodes them once, skipping the text
+    layer's incremental decoding. Newlines are translated as text mode
+    would, so matches and snippets are unaffected.
+    """
+    with open(file_path, 'rb') as f:
+        content = f.read().decode('utf-8', 'ignore')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+def _is_seizure_candidate(name: str, attrs: Dict[str, Any]) -> bool:
+    if name in ('video', 'img') or 'style' in attrs:
+        return True
+    classes = attrs.get('class')
+    if not classes:
+        return False
+    if not isinstance(classes, str):
+        classes = ' '.join(classes)
+    return ANIMATION_CLASS_PATTERN.search(classes) is not None
+
+# An HTML file can only yield findings if its lowercased text holds one of
+# these: inline styles are reported only through the flash analysis, which
+# needs an animation property or @keyframes, and the class, autoplay video
+# and GIF checks need their own words. Character references could spell a
+# keyword without containing it, so files with any are always parsed.
+HTML_TRIGGER_KEYWORDS = ('animation', '@keyframes', 'animate', 'flash', 'blink', 'pulse', 'autoplay', '.gif')
+
+def _may_have_seizure_content(content: str) -> bool:
+    lowered = content.lower()
+    return '&#' in lowered or any(keyword in lowered for keyword in HTML_TRIGGER_KEYWORDS)
+
+# CSS rule blocks holding no nested block: selectors and declarations
+CSS_RULE_PATTERN = re.compile(r'([^{}]+)\{([^{}]*)\}')
+
+# Comments and quoted strings, removed before rule blocks are matched since
+# either can hold braces or semicolons
+CSS_COMMENT_OR_STRING_PATTERN = re.compile(
+    r'/\*.*?(?:\*/|\Z)|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'', re.DOTALL
+)
+
+# Animation and transition declarations: property name and value, without
+# any !important flag
+CSS_ANIMATION_DECLARATION_PATTERN = re.compile(
+    r'(?<![\w-])(animation(?:-[a-z-]+)?|transition(?:-[a-z-]+)?)\s*:\s*([^;!]+)', re.IGNORECASE
+)
+
+# CSS rules are reported only for an infinite animation-iteration-count, so
+# stylesheets without both words are skipped
+CSS_TRIGGER_KEYWORDS = ('animation-iteration-count', 'infinite')
+
+def _may_have_infinite_css_animation(content: str) -> bool:
+    lowered = content.lower()
+    return all(keyword in lowered for keyword in CSS_TRIGGER_KEYWORDS)
+
+def _strip_css_comment_or_string(match) -> str:
+    # Strings are kept as empty strings so attribute selectors stay readable
+    return '' if match.group(0).startswith('/*') else '""'
+
+# Keeps only the elements the HTML checks look at (inline styles, animation
+# classes, videos and images), with their subtrees. bs4 calls a callable
+# name filter with (name, attrs) while building the tree.
+SEIZURE_STRAINER = SoupStrainer(_is_seizure_candidate)
 
 class SeizureSafeAgent(BaseAgent):
     """Agent responsible for evaluating seizure safety compliance."""
@@ -31,256 +164,184 @@ class SeizureSafeAgent(BaseAgent):
     
     async def analyze(self, upload_path: str) -> List[Finding]:
         """Analyze uploaded files for seizure safety issues."""
-        self.findings = []
-        
-        # Find all HTML, CSS, and JavaScript files
-        html_files = self._find_files(upload_path, ['.html', '.htm', '.xhtml'])
-        css_files = self._find_files(upload_path, ['.css', '.scss', '.sass'])
-        js_files = self._find_files(upload_path, ['.js', '.jsx', '.ts', '.tsx'])
-        qml_files = self._find_files(upload_path, ['.qml'])
+        findings = []
         
-        # Analyze HTML files for animations and flashing content
-        for html_file in html_files:
-            await self._analyze_html_file(html_file, upload_path)
+        # Find all HTML, CSS, JavaScript and QML files in one walk;
+        # _analyze_file picks the checks for each by its extension
+        files = self._find_files(upload_path, SEIZURE_EXTENSIONS)
         
-        # Analyze CSS files for animations and transitions
-        for css_file in css_files:
-            await self._analyze_css_file(css_file, upload_path)
+        # Files are independent, so analyze them concurrently
+        for file_findings in await self._analyze_files(files, upload_path):
+            findings.extend(file_findings)
         
-        # Analyze JavaScript files for animation code
-        for js_file in js_files:
-            await self._analyze_js_file(js_file, upload_path)
-        
-        # Analyze QML files for animations
-        for qml_file in qml_files:
-            await self._analyze_qml_file(qml_file, upload_path)
-        
-        return self.findings
+        self.findings = findings
+        return findings
     
-    def _find_files(self, upload_path: str, extensions: List[str]) -> List[str]:
-        """Find files with specific extensions."""
-        files = []
-        for root, dirs, filenames in os.walk(upload_path):
-            for filename in filenames:
-                if Path(filename).suffix.lower() in extensions:
-                    files.append(os.path.join(root, filename))
-        return files
+    def _analyze_file(self, file_path: str, upload_path: str) -> List[Finding]:
+        """Analyze a single file with the checks for its type."""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in HTML_EXTENSIONS:
+            return self._analyze_html_file(file_path, upload_path)
+        if extension in CSS_EXTENSIONS:
+            return self._analyze_css_file(file_path, upload_path)
+        if extension in JS_EXTENSIONS:
+            return self._analyze_js_file(file_path, upload_path)
+        if extension in QML_EXTENSIONS:
+            return self._analyze_qml_file(file_path, upload_path)
+        return []
     
-    async def _analyze_html_file(self, file_path: str, upload_path: str):
+    def _analyze_html_file(self, file_path: str, upload_path: str) -> List[Finding]:
         """Analyze HTML file for seizure-inducing content."""
+        # Findings are collected in a list of the file's own, so files
+        # analyzed in different threads never share one
+        findings = []
+        relative_path = os.path.relpath(file_path, upload_path)
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = _read_text(file_path)
+            
+            # Skip the parse for pages that cannot hold anything to report
+            if not _may_have_seizure_content(content):
+                return findings
+            
+            soup = self._make_soup(content, parse_only=SEIZURE_STRAINER)
             
-            soup = BeautifulSoup(content, 'html.parser')
-            relative_path = os.path.relpath(file_path, upload_path)
+            # Sort the elements for each check in one walk of the tree;
+            # the checks then run in turn, so findings keep their order
+            styled_elements = []
+            animation_class_elements = []
+            video_elements = []
+            img_elements = []
+            for element in soup.find_all(True):
+                # Each element's attributes are read once, straight from
+                # its attrs dict
+                attrs = element.attrs
+                style = attrs.get('style')
+                if style is not None:
+                    styled_elements.append((element, style))
+                classes = attrs.get('class')
+                if classes:
+                    if isinstance(classes, str):
+                        classes = classes.split()
+                    if ANIMATION_CLASS_PATTERN.search(' '.join(classes)):
+                        animation_class_elements.append((element, classes))
+                name = element.name
+                if name == 'video':
+                    video_elements.append(element)
+                elif name == 'img':
+                    img_elements.append(element)
             
             # Check for inline styles with animations
-            elements_with_animations = soup.find_all(attrs={'style': True})
-            for element in elements_with_animations:
-                style = element.get('style', '')
+            for element, style in styled_elements:
                 if self._contains_animation(style):
-                    await self._check_element_animation(element, style, relative_path, file_path)
+                    self._check_element_animation(findings, element, style, relative_path, file_path)
             
             # Check for elements with animation classes
-            elements_with_animation_classes = soup.find_all(class_=re.compile(r'animate|flash|blink|pulse'))
-            for element in elements_with_animation_classes:
-                classes = element.get('class', [])
-                if isinstance(classes, str):
-                    classes = classes.split()
-                
+            for element, classes in animation_class_elements:
                 for class_name in classes:
                     if self._is_animation_class(class_name):
-                        await self._check_animation_class(element, class_name, relative_path, file_path)
+                        self._check_animation_class(findings, element, class_name, relative_path, file_path)
             
             # Check for video elements with autoplay
-            video_elements = soup.find_all('video')
             for video in video_elements:
                 if video.get('autoplay'):
-                    await self._check_autoplay_video(video, relative_path, file_path)
+                    self._check_autoplay_video(findings, video, relative_path, file_path)
             
             # Check for GIF images (potential seizure risk)
-            img_elements = soup.find_all('img')
             for img in img_elements:
                 src = img.get('src', '')
                 if src.lower().endswith('.gif'):
-                    await self._check_gif_image(img, relative_path, file_path)
+                    self._check_gif_image(findings, img, relative_path, file_path)
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error analyzing HTML file: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error analyzing HTML file: {str(e)}")
+        
+        return findings
     
-    async def _analyze_css_file(self, file_path: str, upload_path: str):
+    def _analyze_css_file(self, file_path: str, upload_path: str) -> List[Finding]:
         """Analyze CSS file for seizure-inducing animations."""
+        findings = []
+        relative_path = os.path.relpath(file_path, upload_path)
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = _read_text(file_path)
             
-            relative_path = os.path.relpath(file_path, upload_path)
+            # Skip stylesheets that cannot hold anything to report
+            if not _may_have_infinite_css_animation(content):
+                return findings
             
-            # Parse CSS
-            stylesheet = parse_stylesheet(content)
+            if '/*' in content or '"' in content or "'" in content:
+                content = CSS_COMMENT_OR_STRING_PATTERN.sub(_strip_css_comment_or_string, content)
             
-            for rule in stylesheet:
-                if hasattr(rule, 'prelude') and hasattr(rule, 'content'):
-                    # Extract selectors
-                    selectors = self._extract_selectors(rule.prelude)
-                    
-                    # Extract animation properties
-                    animation_props = self._extract_animation_properties(rule.content)
-                    
-                    # Check for seizure-inducing animations
-                    if animation_props:
-                        await self._check_css_animations(selectors, animation_props, relative_path, file_path)
+            # Innermost rule blocks, so rules nested in @media and similar
+            # blocks are checked too
+            for rule in CSS_RULE_PATTERN.finditer(content):
+                # Extract animation properties
+                animation_props = {
+                    name.lower(): value.strip()
+                    for name, value in CSS_ANIMATION_DECLARATION_PATTERN.findall(rule.group(2))
+                }
+                
+                # Check for seizure-inducing animations
+                if animation_props:
+                    # Statements ending in ';' (such as @import) can precede
+                    # the selectors, which are comma separated
+                    prelude = rule.group(1).rsplit(';', 1)[-1]
+                    selectors = [selector.strip() for selector in prelude.split(',') if selector.strip()]
+                    self._check_css_animations(findings, selectors, animation_props, relative_path, file_path)
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error analyzing CSS file: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error analyzing CSS file: {str(e)}")
+        
+        return findings
     
-    async def _analyze_js_file(self, file_path: str, upload_path: str):
+    def _analyze_js_file(self, file_path: str, upload_path: str) -> List[Finding]:
         """Analyze JavaScript file for animation code."""
+        findings = []
+        relative_path = os.path.relpath(file_path, upload_path)
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            relative_path = os.path.relpath(file_path, upload_path)
+            content = _read_text(file_path)
             
             # Check for animation-related code patterns
-            animation_patterns = [
-                r'setInterval\s*\([^,]+,\s*(\d+)',  # setInterval with timing
-                r'setTimeout\s*\([^,]+,\s*(\d+)',   # setTimeout with timing
-                r'requestAnimationFrame',            # requestAnimationFrame
-                r'\.animate\s*\(',                   # jQuery animate
-                r'\.transition\s*\(',                # CSS transitions
-                r'\.transform\s*\(',                 # CSS transforms
-                r'opacity\s*:\s*[\d.]+',            # Opacity changes
-                r'visibility\s*:\s*(hidden|visible)', # Visibility changes
-            ]
-            
-            for pattern in animation_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+            lowered = content.lower()
+            for keyword, pattern in JS_ANIMATION_PATTERNS:
+                if keyword not in lowered:
+                    continue
+                matches = pattern.finditer(content)
                 for match in matches:
-                    await self._check_js_animation(match, pattern, relative_path, file_path)
+                    self._check_js_animation(findings, match, pattern.pattern, relative_path, file_path)
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error analyzing JavaScript file: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error analyzing JavaScript file: {str(e)}")
+        
+        return findings
     
-    async def _analyze_qml_file(self, file_path: str, upload_path: str):
+    def _analyze_qml_file(self, file_path: str, upload_path: str) -> List[Finding]:
         """Analyze QML file for animations."""
+        findings = []
+        relative_path = os.path.relpath(file_path, upload_path)
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            relative_path = os.path.relpath(file_path, upload_path)
+            content = _read_text(file_path)
             
-            # Check for QML animation patterns
-            animation_patterns = [
-                r'NumberAnimation',      # QML NumberAnimation
-                r'PropertyAnimation',    # QML PropertyAnimation
-                r'SequentialAnimation',  # QML SequentialAnimation
-                r'ParallelAnimation',    # QML ParallelAnimation
-                r'Animation\s*\{',       # QML Animation blocks
-                r'duration\s*:\s*(\d+)', # Animation duration
-                r'loops\s*:\s*Animation\.Infinite', # Infinite loops
-            ]
-            
-            for pattern in animation_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    await self._check_qml_animation(match, pattern, relative_path, file_path)
+            # Check for infinite QML animations
+            if 'infinite' in content.lower():
+                for match in QML_INFINITE_LOOP_PATTERN.finditer(content):
+                    self._check_qml_animation(findings, match, QML_INFINITE_LOOP_PATTERN.pattern, relative_path, file_path)
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error analyzing QML file: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error analyzing QML file: {str(e)}")
+        
+        return findings
     
     def _contains_animation(self, style: str) -> bool:
         """Check if CSS style contains animation properties."""
-        animation_properties = [
-            'animation', 'animation-name', 'animation-duration', 'animation-iteration-count',
-            'transition', 'transform', 'opacity', 'visibility'
-        ]
-        
-        for prop in animation_properties:
-            if prop in style.lower():
-                return True
-        return False
+        style_lower = style.lower()
+        return any(prop in style_lower for prop in ANIMATION_STYLE_PROPERTIES)
     
     def _is_animation_class(self, class_name: str) -> bool:
         """Check if CSS class name suggests animation."""
-        animation_keywords = [
-            'animate', 'animation', 'flash', 'blink', 'pulse', 'fade', 'slide',
-            'bounce', 'shake', 'wiggle', 'rotate', 'scale', 'zoom'
-        ]
-        
         class_lower = class_name.lower()
-        for keyword in animation_keywords:
-            if keyword in class_lower:
-                return True
-        return False
+        return any(keyword in class_lower for keyword in ANIMATION_CLASS_KEYWORDS)
     
-    def _extract_selectors(self, prelude) -> List[str]:
-        """Extract CSS selectors from rule prelude."""
-        selectors = []
-        
-        if isinstance(prelude, list):
-            current_selector = ""
-            for token in prelude:
-                if hasattr(token, 'type'):
-                    if token.type == 'ident':
-                        if current_selector:
-                            current_selector += " " + token.value
-                        else:
-                            current_selector = token.value
-                    elif token.type == 'literal' and token.value == ',':
-                        if current_selector:
-                            selectors.append(current_selector.strip())
-                            current_selector = ""
-                    elif token.type == 'whitespace':
-                        if current_selector:
-                            current_selector += " "
-            
-            if current_selector:
-                selectors.append(current_selector.strip())
-        
-        return selectors
-    
-    def _extract_animation_properties(self, content) -> Dict[str, str]:
-        """Extract animation-related properties from CSS rule content."""
-        animation_props = {}
-        
-        if isinstance(content, list):
-            i = 0
-            while i < len(content):
-                token = content[i]
-                
-                if hasattr(token, 'type') and token.type == 'ident':
-                    prop_name = token.value
-                    
-                    if prop_name in [
-                        'animation', 'animation-name', 'animation-duration', 
-                        'animation-iteration-count', 'animation-timing-function',
-                        'transition', 'transition-duration', 'transition-timing-function'
-                    ]:
-                        # Look for the colon
-                        i += 1
-                        while i < len(content) and hasattr(content[i], 'type') and content[i].type in ['whitespace', 'literal']:
-                            if hasattr(content[i], 'type') and content[i].type == 'literal' and content[i].value == ':':
-                                break
-                            i += 1
-                        
-                        # Skip whitespace after colon
-                        i += 1
-                        while i < len(content) and hasattr(content[i], 'type') and content[i].type == 'whitespace':
-                            i += 1
-                        
-                        # Extract the value
-                        if i < len(content):
-                            value_token = content[i]
-                            if hasattr(value_token, 'value'):
-                                animation_props[prop_name] = str(value_token.value)
-                
-                i += 1
-        
-        return animation_props
-    
-    async def _check_element_animation(self, element, style: str, relative_path: str, file_path: str):
+    def _check_element_animation(self, findings: List[Finding], element, style: str, relative_path: str, file_path: str):
         """Check element for seizure-inducing animations."""
         try:
             # Analyze the style for seizure risks
@@ -289,13 +350,13 @@ class SeizureSafeAgent(BaseAgent):
             if not analysis["safe"]:
                 for violation in analysis["violations"]:
                     self._add_seizure_finding(
-                        element, violation, relative_path, file_path, 'inline_style'
+                        findings, element, violation, relative_path, file_path, 'inline_style'
                     )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking element animation: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking element animation: {str(e)}")
     
-    async def _check_animation_class(self, element, class_name: str, relative_path: str, file_path: str):
+    def _check_animation_class(self, findings: List[Finding], element, class_name: str, relative_path: str, file_path: str):
         """Check animation class for seizure risks."""
         try:
             # Create a mock violation for animation classes
@@ -309,59 +370,42 @@ class SeizureSafeAgent(BaseAgent):
             }
             
             self._add_seizure_finding(
-                element, violation, relative_path, file_path, 'animation_class'
+                findings, element, violation, relative_path, file_path, 'animation_class'
             )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking animation class: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking animation class: {str(e)}")
     
-    async def _check_autoplay_video(self, video_element, relative_path: str, file_path: str):
+    def _check_autoplay_video(self, findings: List[Finding], video_element, relative_path: str, file_path: str):
         """Check autoplay video for seizure risks."""
         try:
-            violation = {
-                "type": "autoplay_video",
-                "severity": "high",
-                "description": "Autoplay video may cause seizures",
-                "criterion": "2.3.1",
-                "frequency": "unknown",
-                "duration": "unknown"
-            }
-            
             self._add_seizure_finding(
-                video_element, violation, relative_path, file_path, 'autoplay_video'
+                findings, video_element, AUTOPLAY_VIDEO_VIOLATION, relative_path, file_path, 'autoplay_video'
             )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking autoplay video: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking autoplay video: {str(e)}")
     
-    async def _check_gif_image(self, img_element, relative_path: str, file_path: str):
+    def _check_gif_image(self, findings: List[Finding], img_element, relative_path: str, file_path: str):
         """Check GIF image for seizure risks."""
         try:
-            violation = {
-                "type": "gif_image",
-                "severity": "medium",
-                "description": "Animated GIF may cause seizures",
-                "criterion": "2.3.1",
-                "frequency": "unknown",
-                "duration": "unknown"
-            }
-            
             self._add_seizure_finding(
-                img_element, violation, relative_path, file_path, 'gif_image'
+                findings, img_element, GIF_IMAGE_VIOLATION, relative_path, file_path, 'gif_image'
             )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking GIF image: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking GIF image: {str(e)}")
     
-    async def _check_css_animations(self, selectors: List[str], animation_props: Dict[str, str], relative_path: str, file_path: str):
+    def _check_css_animations(self, findings: List[Finding], selectors: List[str], animation_props: Dict[str, str], relative_path: str, file_path: str):
         """Check CSS animations for seizure risks."""
         try:
             # Analyze animation properties
             duration = animation_props.get('animation-duration', '0s')
             iteration_count = animation_props.get('animation-iteration-count', '1')
             
-            # Check for infinite animations
-            if iteration_count == 'infinite':
+            # Check for infinite animations; a list gives one count per
+            # animation name
+            if any(count.strip() == 'infinite' for count in iteration_count.lower().split(',')):
                 violation = {
                     "type": "infinite_animation",
                     "severity": "high",
@@ -373,17 +417,17 @@ class SeizureSafeAgent(BaseAgent):
                 
                 for selector in selectors:
                     self._add_css_seizure_finding(
-                        selector, violation, relative_path, file_path
+                        findings, selector, violation, relative_path, file_path
                     )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking CSS animations: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking CSS animations: {str(e)}")
     
-    async def _check_js_animation(self, match, pattern: str, relative_path: str, file_path: str):
+    def _check_js_animation(self, findings: List[Finding], match, pattern: str, relative_path: str, file_path: str):
         """Check JavaScript animation for seizure risks."""
         try:
             # Extract timing information if available
-            timing_match = re.search(r'(\d+)', match.group(0))
+            timing_match = TIMING_PATTERN.search(match.group(0))
             timing = int(timing_match.group(1)) if timing_match else 0
             
             # Check for rapid animations (less than 500ms)
@@ -398,49 +442,35 @@ class SeizureSafeAgent(BaseAgent):
                 }
                 
                 self._add_js_seizure_finding(
-                    match.group(0), violation, relative_path, file_path
+                    findings, match.group(0), violation, relative_path, file_path
                 )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking JavaScript animation: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking JavaScript animation: {str(e)}")
     
-    async def _check_qml_animation(self, match, pattern: str, relative_path: str, file_path: str):
+    def _check_qml_animation(self, findings: List[Finding], match, pattern: str, relative_path: str, file_path: str):
         """Check QML animation for seizure risks."""
         try:
             # Check for infinite loops
             if 'Infinite' in match.group(0):
-                violation = {
-                    "type": "infinite_qml_animation",
-                    "severity": "high",
-                    "description": "Infinite QML animation may cause seizures",
-                    "criterion": "2.3.1",
-                    "frequency": "continuous",
-                    "duration": "unknown"
-                }
-                
                 self._add_qml_seizure_finding(
-                    match.group(0), violation, relative_path, file_path
+                    findings, match.group(0), INFINITE_QML_ANIMATION_VIOLATION, relative_path, file_path
                 )
         
         except Exception as e:
-            self._add_error_finding(file_path, relative_path, f"Error checking QML animation: {str(e)}")
+            self._add_error_finding(findings, file_path, relative_path, f"Error checking QML animation: {str(e)}")
     
-    def _add_seizure_finding(self, element, violation: Dict[str, Any], relative_path: str, file_path: str, element_type: str):
+    def _add_seizure_finding(self, findings: List[Finding], element, violation: Dict[str, Any], relative_path: str, file_path: str, element_type: str):
         """Add a seizure safety finding."""
         finding_id = generate_finding_id()
         
         # Determine severity
-        if violation["severity"] == "high":
-            severity = SeverityLevel.HIGH
-        elif violation["severity"] == "medium":
-            severity = SeverityLevel.MEDIUM
-        else:
-            severity = SeverityLevel.LOW
+        severity = VIOLATION_SEVERITY.get(violation["severity"], SeverityLevel.LOW)
         
         # Create evidence
         evidence = Evidence(
             file_path=relative_path,
-            code_snippet=str(element),
+            code_snippet=self._element_snippet(element),
             metrics=violation
         )
         
@@ -457,19 +487,14 @@ class SeizureSafeAgent(BaseAgent):
             wcag_criterion=violation["criterion"]
         )
         
-        self.findings.append(finding)
+        findings.append(finding)
     
-    def _add_css_seizure_finding(self, selector: str, violation: Dict[str, Any], relative_path: str, file_path: str):
+    def _add_css_seizure_finding(self, findings: List[Finding], selector: str, violation: Dict[str, Any], relative_path: str, file_path: str):
         """Add a CSS seizure safety finding."""
         finding_id = generate_finding_id()
         
         # Determine severity
-        if violation["severity"] == "high":
-            severity = SeverityLevel.HIGH
-        elif violation["severity"] == "medium":
-            severity = SeverityLevel.MEDIUM
-        else:
-            severity = SeverityLevel.LOW
+        severity = VIOLATION_SEVERITY.get(violation["severity"], SeverityLevel.LOW)
         
         # Create evidence
         evidence = Evidence(
@@ -490,19 +515,14 @@ class SeizureSafeAgent(BaseAgent):
             wcag_criterion=violation["criterion"]
         )
         
-        self.findings.append(finding)
+        findings.append(finding)
     
-    def _add_js_seizure_finding(self, code_snippet: str, violation: Dict[str, Any], relative_path: str, file_path: str):
+    def _add_js_seizure_finding(self, findings: List[Finding], code_snippet: str, violation: Dict[str, Any], relative_path: str, file_path: str):
         """Add a JavaScript seizure safety finding."""
         finding_id = generate_finding_id()
         
         # Determine severity
-        if violation["severity"] == "high":
-            severity = SeverityLevel.HIGH
-        elif violation["severity"] == "medium":
-            severity = SeverityLevel.MEDIUM
-        else:
-            severity = SeverityLevel.LOW
+        severity = VIOLATION_SEVERITY.get(violation["severity"], SeverityLevel.LOW)
         
         # Create evidence
         evidence = Evidence(
@@ -523,19 +543,14 @@ class SeizureSafeAgent(BaseAgent):
             wcag_criterion=violation["criterion"]
         )
         
-        self.findings.append(finding)
+        findings.append(finding)
     
-    def _add_qml_seizure_finding(self, code_snippet: str, violation: Dict[str, Any], relative_path: str, file_path: str):
+    def _add_qml_seizure_finding(self, findings: List[Finding], code_snippet: str, violation: Dict[str, Any], relative_path: str, file_path: str):
         """Add a QML seizure safety finding."""
         finding_id = generate_finding_id()
         
         # Determine severity
-        if violation["severity"] == "high":
-            severity = SeverityLevel.HIGH
-        elif violation["severity"] == "medium":
-            severity = SeverityLevel.MEDIUM
-        else:
-            severity = SeverityLevel.LOW
+        severity = VIOLATION_SEVERITY.get(violation["severity"], SeverityLevel.LOW)
         
         # Create evidence
         evidence = Evidence(
@@ -556,9 +571,9 @@ class SeizureSafeAgent(BaseAgent):
             wcag_criterion=violation["criterion"]
         )
         
-        self.findings.append(finding)
+        findings.append(finding)
     
-    def _add_error_finding(self, file_path: str, relative_path: str, error_message: str):
+    def _add_error_finding(self, findings: List[Finding], file_path: str, relative_path: str, error_message: str):
         """Add an error finding."""
         finding_id = generate_finding_id()
         
@@ -579,7 +594,22 @@ class SeizureSafeAgent(BaseAgent):
             wcag_criterion="N/A"
         )
         
-        self.findings.append(finding)
+        findings.append(finding)
+    
+    def _element_snippet(self, element) -> str:
+        """Serialize a bs4 element for evidence, cut to EVIDENCE_HTML_MAX_LENGTH.
+        
+        Memoized per file while _analyze_file_with_caches runs.
+        """
+        cache = getattr(self._local, 'html_cache', None)
+        if cache is None:
+            return element.decode()[:EVIDENCE_HTML_MAX_LENGTH]
+        # bs4 tags hash by serializing themselves, so they are keyed by
+        # identity; the soup keeps every tag alive while its file is checked
+        snippet = cache.get(id(element))
+        if snippet is None:
+            snippet = cache[id(element)] = element.decode()[:EVIDENCE_HTML_MAX_LENGTH]
+        return snippet
     
     def _get_element_selector(self, element) -> str:
         """Get a CSS selector for an element."""
@@ -11,6 +11,7 @@ from routers.progress import (
     send_agent_start, send_agent_progress, send_agent_complete, 
     send_agent_error, send_analysis_start, send_analysis_complete
 )
+from services.agents.base_agent import find_files, parse_cache
 from services.agents.special.contrast_agent import ContrastAgent
 from services.agents.special.seizure_safe_agent import SeizureSafeAgent
 from services.agents.special.language_agent import LanguageAgent
@@ -136,6 +137,11 @@ class SuperAgent:
             execution_results['errors'].append(str(e))
             await send_agent_error(plan.upload_id, "SuperAgent", f"Execution failed: {str(e)}")
         
+        finally:
+            # File lists and parsed trees are only shared within a run
+            find_files.cache_clear()
+            parse_cache.clear()
+        
         return execution_results
     
     async def _execute_agent_group(self, agent_names: List[str], upload_path: str, upload_id: str, execution_results: Dict[str, Any]):
@@ -0,0 +1,63 @@
+import pytest
+from services.agents.special import language_agent
+from services.agents.special.language_agent import LanguageAgent
+
+
+def issues(findings):
+    return [finding.evidence[0].metrics.get('issue') for finding in findings]
+
+
+@pytest.mark.parametrize("prefix", [
+    '<!-- template: <html lang="en"> -->',
+    '<script>document.write(\'<html lang="en">\');</script>',
+    '<![CDATA[<html lang="en">]]>',
+])
+def test_root_lang_ignores_html_tag_in_comment_script_or_cdata(tmp_path, prefix):
+    """The root lang is read from the real html element"""
+    page = tmp_path / "index.html"
+    page.write_text(prefix + "\n<html><body><p>Hello</p></body></html>", encoding="utf-8")
+
+    findings = LanguageAgent()._analyze_html_file(str(page), str(tmp_path))
+
+    assert "missing_lang_attribute" in issues(findings)
+
+
+def test_streamed_root_lang_ignores_html_tag_in_comment(tmp_path, monkeypatch):
+    """Large files read the root start tag with the same rules"""
+    monkeypatch.setattr(language_agent, "STREAMING_THRESHOLD", 0)
+    page = tmp_path / "index.html"
+    page.write_text('<!-- template: <html lang="en"> -->\n<html><body><p>Hello</p></body></html>', encoding="utf-8")
+
+    findings = LanguageAgent()._analyze_html_file(str(page), str(tmp_path))
+
+    assert "missing_lang_attribute" in issues(findings)
+
+
+def test_root_lang_is_read_from_html_element(tmp_path):
+    """A document with a valid root lang has no root finding"""
+    page = tmp_path / "index.html"
+    page.write_text('<!-- <html> -->\n<html lang="en"><body><p>Hello</p></body></html>', encoding="utf-8")
+
+    findings = LanguageAgent()._analyze_html_file(str(page), str(tmp_path))
+
+    assert "missing_lang_attribute" not in issues(findings)
+
+
+def test_nested_qml_text_elements_report_each_string_once():
+    """A string is reported once even when Text elements are nested"""
+    content = 'Text { id: outer; Text { text: "Привет мир" } }'
+
+    findings = LanguageAgent()._check_qml_language(content, "main.qml", "main.qml")
+
+    assert issues(findings) == ["qml_text_language_context"]
+    assert findings[0].evidence[0].metrics["text"] == "Привет мир"
+
+
+
+def test_qml_text_with_language_property_is_reported():
+    """A nearby language property does not hide foreign text"""
+    content = 'Item { property string language: "en"; Text { text: "Привет мир" } }'
+
+    findings = LanguageAgent()._check_qml_language(content, "main.qml", "main.qml")
+
+    assert issues(findings) == ["qml_text_language_context"]
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import pytest
+from services.agents import base_agent
+from services.agents.special.seizure_safe_agent import SeizureSafeAgent
+
+SOURCES = {
+    ".css": "#blinker { animation-iteration-count: infinite; animation-duration: 0.1s }\n",
+    ".html": '<html><body><video autoplay src="x.mp4"></video><p class="blink">y</p></body></html>\n',
+    ".qml": "Rectangle { SequentialAnimation on opacity { loops: Animation.Infinite } }\n",
+    ".js": "setInterval(flash, 100);\n",
+}
+
+
+def comparable(batches):
+    return [
+        [finding.model_dump(exclude={"id", "created_at"}) for finding in findings]
+        for findings in batches
+    ]
+
+
+@pytest.mark.parametrize("selector, css", [
+    (".spinner", ".spinner { animation-iteration-count: infinite !important }"),
+    (".multi", ".multi { animation-iteration-count: infinite, 1 }"),
+    (".quote", '.quote { content: "}"; animation-iteration-count: infinite }'),
+])
+def test_infinite_css_animation_is_reported(tmp_path, selector, css):
+    """Infinite iteration counts are found whatever surrounds them"""
+    stylesheet = tmp_path / "style.css"
+    stylesheet.write_text(css, encoding="utf-8")
+
+    findings = SeizureSafeAgent()._analyze_css_file(str(stylesheet), str(tmp_path))
+
+    assert [finding.evidence[0].code_snippet for finding in findings] == [f"selector: {selector}"]
+    assert findings[0].evidence[0].metrics["type"] == "infinite_animation"
+
+
+def test_process_pool_matches_threads(tmp_path, monkeypatch):
+    """Large uploads give the same findings in worker processes as in threads"""
+    file_paths = []
+    for index in range(5):
+        for extension, source in SOURCES.items():
+            path = tmp_path / f"file{index}{extension}"
+            path.write_text(source, encoding="utf-8")
+            file_paths.append(str(path))
+    assert len(file_paths) >= base_agent.PROCESS_POOL_MIN_FILES
+
+    monkeypatch.setattr(base_agent, "PROCESS_POOL_MIN_FILES", len(file_paths) + 1)
+    threaded = asyncio.run(SeizureSafeAgent()._analyze_files(file_paths, str(tmp_path)))
+
+    monkeypatch.setattr(base_agent, "PROCESS_POOL_MIN_FILES", len(file_paths))
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    try:
+        pooled = asyncio.run(SeizureSafeAgent()._analyze_files(file_paths, str(tmp_path)))
+        assert base_agent._process_pool is not None
+    finally:
+        base_agent.shutdown_process_pool()
+
+    assert base_agent._process_pool is None
+    assert any(threaded)
+    assert comparable(pooled) == comparable(threaded)
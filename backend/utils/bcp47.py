@@ -3,7 +3,8 @@ BCP-47 language tag validation and canonicalization utilities.
 """
 
 import re
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 
 @dataclass
@@ -244,8 +245,7 @@ def parse_language_tag(tag: str) -> Optional[LanguageTag]:
     
     return language_tag
 
-def validate_language_tag(tag: str) -> Dict[str, Any]:
-    """Validate a BCP-47 language tag and return validation results."""
+def _validate_language_tag(tag: str) -> Dict[str, Any]:
     result = {
         "valid": False,
         "canonical": None,
@@ -306,6 +306,43 @@ def validate_language_tag(tag: str) -> Dict[str, Any]:
     
     return result
 
+_validate_language_tag_cached = lru_cache(maxsize=1024)(_validate_language_tag)
+
+def validate_language_tag(tag: str) -> Dict[str, Any]:
+    """Validate a BCP-47 language tag and return validation results."""
+    # Parsing lowercases the tag, so its lowercase form is a safe cache key
+    if isinstance(tag, str):
+        result = _validate_language_tag_cached(tag.lower())
+    else:
+        result = _validate_language_tag(tag)
+    
+    # Return a copy so callers cannot modify the cached result
+    return {
+        **result,
+        "errors": list(result["errors"]),
+        "warnings": list(result["warnings"]),
+        "components": dict(result["components"])
+    }
+
+# Tags already in canonical form: lowercase language, optional title-case
+# script and optional uppercase region (e.g. "en", "en-US", "zh-Hant-TW")
+CANONICAL_TAG_PATTERN = re.compile(r'[a-z]{2,3}(?:-[A-Z][a-z]{3})?(?:-[A-Z]{2})?')
+
+@lru_cache(maxsize=8192)
+def _validate_language_code_cached(tag: str) -> Tuple[bool, Optional[str]]:
+    # Same outcome as validate_language_tag without building its
+    # warnings and components
+    parsed = parse_language_tag(tag)
+    if not parsed:
+        return False, None
+    return True, str(parsed)
+
+def validate_language_code(tag: str) -> Tuple[bool, Optional[str]]:
+    """Return (is_valid, canonical) for a language tag, skipping full validation for canonical tags."""
+    if tag and CANONICAL_TAG_PATTERN.fullmatch(tag):
+        return True, tag
+    return _validate_language_code_cached(tag.lower() if isinstance(tag, str) else tag)
+
 def get_language_name(tag: str) -> Optional[str]:
     """Get the human-readable name of a language tag."""
     parsed = parse_language_tag(tag)
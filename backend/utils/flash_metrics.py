@@ -4,10 +4,51 @@ Flash and animation detection utilities for seizure safety evaluation.
 
 import re
 import math
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Optional
 from dataclasses import dataclass
 from .wcag_constants import FLASH_THRESHOLDS
 
+# @keyframes blocks: name and body
+KEYFRAMES_PATTERN = re.compile(r'@keyframes\s+(\w+)\s*\{([^}]+)\}', re.IGNORECASE | re.DOTALL)
+# animation shorthand values
+ANIMATION_PROPERTY_PATTERN = re.compile(r'animation\s*:\s*([^;]+)', re.IGNORECASE)
+# Keyframe steps inside a @keyframes body: offset and properties
+KEYFRAME_STEP_PATTERN = re.compile(r'(\d+(?:\.\d+)?%?)\s*\{([^}]+)\}')
+COLOR_PROPERTY_PATTERN = re.compile(
+    r'(?:color|background-color|border-color|outline-color)\s*:\s*([^;]+)', re.IGNORECASE
+)
+OPACITY_PROPERTY_PATTERN = re.compile(r'opacity\s*:\s*([^;]+)', re.IGNORECASE)
+
+# Longest CSS text whose animation safety analysis is cached
+CACHED_CSS_MAX_LENGTH = 16384
+
+# Approximate luminance of common CSS color names
+COLOR_NAME_LUMINANCE = {
+    'black': 0.0,
+    'white': 1.0,
+    'red': 0.3,
+    'green': 0.6,
+    'blue': 0.1,
+    'yellow': 0.9,
+    'cyan': 0.7,
+    'magenta': 0.4,
+    'gray': 0.5,
+    'grey': 0.5,
+    'silver': 0.8,
+    'maroon': 0.2,
+    'olive': 0.4,
+    'lime': 0.8,
+    'aqua': 0.7,
+    'teal': 0.3,
+    'navy': 0.1,
+    'fuchsia': 0.5,
+    'purple': 0.3,
+    'orange': 0.6,
+    'pink': 0.8,
+    'brown': 0.2
+}
+
 @dataclass
 class FlashEvent:
     """Represents a flash event with timing and intensity data."""
@@ -39,9 +80,12 @@ class FlashDetector:
         """Detect flash patterns in CSS animations and transitions."""
         flashes = []
         
+        # Each scan needs a literal "@keyframes" or "animation"; most inline
+        # styles have neither, so check for them before running the patterns
+        lowered = css_content.lower()
+        
         # Find keyframe animations
-        keyframe_pattern = r'@keyframes\s+(\w+)\s*\{([^}]+)\}'
-        keyframe_matches = re.finditer(keyframe_pattern, css_content, re.IGNORECASE | re.DOTALL)
+        keyframe_matches = KEYFRAMES_PATTERN.finditer(css_content) if '@keyframes' in lowered else ()
         
         for match in keyframe_matches:
             animation_name = match.group(1)
@@ -52,8 +96,7 @@ class FlashDetector:
             flashes.extend(keyframe_flashes)
         
         # Find animation properties
-        animation_pattern = r'animation\s*:\s*([^;]+)'
-        animation_matches = re.finditer(animation_pattern, css_content, re.IGNORECASE)
+        animation_matches = ANIMATION_PROPERTY_PATTERN.finditer(css_content) if 'animation' in lowered else ()
         
         for match in animation_matches:
             animation_value = match.group(1)
@@ -67,7 +110,7 @@ class FlashDetector:
         flashes = []
         
         # Parse keyframe steps
-        keyframe_steps = re.findall(r'(\d+(?:\.\d+)?%?)\s*\{([^}]+)\}', keyframe_content)
+        keyframe_steps = KEYFRAME_STEP_PATTERN.findall(keyframe_content)
         
         if len(keyframe_steps) < 2:
             return flashes
@@ -91,10 +134,7 @@ class FlashDetector:
         frames.sort(key=lambda f: f.timestamp)
         
         # Detect flash patterns
-        for i in range(len(frames) - 1):
-            current_frame = frames[i]
-            next_frame = frames[i + 1]
-            
+        for current_frame, next_frame in zip(frames, frames[1:]):
             # Calculate luminance change
             luminance_change = abs(next_frame.luminance - current_frame.luminance)
             
@@ -167,8 +207,7 @@ class FlashDetector:
     def _extract_luminance(self, properties: str) -> float:
         """Extract luminance value from CSS properties."""
         # Look for color properties
-        color_pattern = r'(?:color|background-color|border-color|outline-color)\s*:\s*([^;]+)'
-        color_match = re.search(color_pattern, properties, re.IGNORECASE)
+        color_match = COLOR_PROPERTY_PATTERN.search(properties)
         
         if color_match:
             color_value = color_match.group(1).strip()
@@ -179,8 +218,7 @@ class FlashDetector:
     
     def _extract_opacity(self, properties: str) -> float:
         """Extract opacity value from CSS properties."""
-        opacity_pattern = r'opacity\s*:\s*([^;]+)'
-        opacity_match = re.search(opacity_pattern, properties, re.IGNORECASE)
+        opacity_match = OPACITY_PROPERTY_PATTERN.search(properties)
         
         if opacity_match:
             try:
@@ -195,36 +233,12 @@ class FlashDetector:
         # This is a simplified implementation
         # In practice, you'd use the full color parsing and luminance calculation
         
-        # Handle common color names
-        color_map = {
-            'black': 0.0,
-            'white': 1.0,
-            'red': 0.3,
-            'green': 0.6,
-            'blue': 0.1,
-            'yellow': 0.9,
-            'cyan': 0.7,
-            'magenta': 0.4,
-            'gray': 0.5,
-            'grey': 0.5,
-            'silver': 0.8,
-            'maroon': 0.2,
-            'olive': 0.4,
-            'lime': 0.8,
-            'aqua': 0.7,
-            'teal': 0.3,
-            'navy': 0.1,
-            'fuchsia': 0.5,
-            'purple': 0.3,
-            'orange': 0.6,
-            'pink': 0.8,
-            'brown': 0.2
-        }
-        
         color_value = color_value.lower().strip()
         
-        if color_value in color_map:
-            return color_map[color_value]
+        # Handle common color names
+        luminance = COLOR_NAME_LUMINANCE.get(color_value)
+        if luminance is not None:
+            return luminance
         
         # Handle hex colors (simplified)
         if color_value.startswith('#'):
@@ -333,8 +347,25 @@ def detect_animation_flashes(css_content: str) -> List[FlashEvent]:
     detector = FlashDetector()
     return detector.detect_css_flashes(css_content)
 
-def analyze_animation_safety(css_content: str) -> Dict[str, Any]:
-    """Convenience function to analyze animation safety."""
+def _analyze_animation_safety(css_content: str) -> Dict[str, Any]:
     detector = FlashDetector()
     flashes = detector.detect_css_flashes(css_content)
     return detector.analyze_flash_safety(flashes)
+
+_analyze_animation_safety_cached = lru_cache(maxsize=1024)(_analyze_animation_safety)
+
+def analyze_animation_safety(css_content: str) -> Dict[str, Any]:
+    """Convenience function to analyze animation safety."""
+    # Inline styles and shared stylesheets recur across elements and
+    # uploads, so results are cached by content; very large stylesheets
+    # are analyzed directly rather than kept alive by the cache
+    if len(css_content) > CACHED_CSS_MAX_LENGTH:
+        return _analyze_animation_safety(css_content)
+    result = _analyze_animation_safety_cached(css_content)
+    
+    # Return a copy so callers cannot modify the cached result
+    return {
+        **result,
+        "violations": [dict(violation) for violation in result["violations"]],
+        "recommendations": [dict(recommendation) for recommendation in result["recommendations"]]
+    }